@@ -0,0 +1,178 @@
+"""Size-budgeted rendering of bot comment bodies.
+
+Bodies are written into one ``StringIO`` while a running UTF-8 byte count is checked against
+a budget below GitHub's 65,536-character comment limit. Findings are grouped by rule
+(severity + message) and path, and whatever does not fit is summarised with exact "N more"
+counts instead of being cut mid-line.
+"""
+
+import hashlib
+import io
+import re
+from typing import Iterable, NamedTuple, Optional
+
+GITHUB_COMMENT_LIMIT = 65536
+# Bytes, not characters, so multi-byte text can never push a body over the limit.
+DEFAULT_BUDGET = 60000
+# Room kept for the "N more" trailer and anything written after the findings.
+TRAILER_RESERVE = 256
+
+SEVERITY_RANK = {"critical": 0, "major": 1, "minor": 2, "info": 3}
+
+# Both markers are only read at the very end of a body, after any user-controlled text (paths).
+_HASH_MARKER = re.compile(r"\n?<!-- mcp-hash:([0-9a-f]{16}) -->\s*\Z")
+_REVIEW_STATE_MARKER = re.compile(
+    r"<!-- mcp-review-state: ([A-Z_]+@[^\s]+) -->(?:\n<!-- mcp-hash:[0-9a-f]{16} -->)?\s*\Z"
+)
+
+
+def escape_markers(text: str) -> str:
+    """Neutralise ``<!--`` in user-controlled text so it can't open a comment or forge a marker."""
+    return text.replace("<!--", "&lt;!--")
+
+
+def body_digest(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def with_hash(body: str) -> str:
+    """Append a marker with the digest of ``body`` so later runs can compare without re-hashing GitHub's copy."""
+    return f"{body}\n<!-- mcp-hash:{body_digest(body)[:16]} -->"
+
+
+def embedded_hash(body: Optional[str]) -> Optional[str]:
+    match = _HASH_MARKER.search(body) if isinstance(body, str) else None
+    return match.group(1) if match else None
+
+
+def review_state(event: str, commit_sha: str, payload: str = "") -> str:
+    """``EVENT@sha`` plus a short digest of the review content (inline comments), if any."""
+    state = f"{event}@{commit_sha}"
+    return f"{state}:{body_digest(payload)[:12]}" if payload else state
+
+
+def review_state_marker(state: str) -> str:
+    return f"<!-- mcp-review-state: {state} -->"
+
+
+def parse_review_state(body: Optional[str]) -> Optional[str]:
+    match = _REVIEW_STATE_MARKER.search(body) if isinstance(body, str) else None
+    return match.group(1) if match else None
+
+
+class CommentBuilder:
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._buffer = io.StringIO()
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.used
+
+    def write(self, text: str, reserve: int = 0) -> bool:
+        """Append ``text`` if it fits while leaving ``reserve`` bytes free; otherwise write nothing."""
+        size = len(text.encode("utf-8", "surrogatepass"))
+        if self.used + size + reserve > self.budget:
+            return False
+        self._buffer.write(text)
+        self.used += size
+        return True
+
+    def write_truncated(self, text: str, suffix: str = "…") -> bool:
+        """Append as much of ``text`` as fits (cut on a line boundary), ending with ``suffix`` if cut."""
+        if self.write(text):
+            return True
+        room = self.remaining - len(suffix.encode("utf-8"))
+        if room <= 0:
+            return False
+        cut = text.encode("utf-8", "surrogatepass")[:room].decode("utf-8", "ignore")
+        cut = cut[: cut.rfind("\n") + 1] or cut
+        self.write(cut + suffix)
+        return False
+
+    def getvalue(self) -> str:
+        return self._buffer.getvalue()
+
+
+class FindingGroup(NamedTuple):
+    severity: str
+    message: str
+    # path -> number of findings in that file, in first-seen order
+    paths: dict
+    count: int
+    first: object
+
+
+def group_findings(findings: Iterable) -> list[FindingGroup]:
+    """Group findings by rule and path, most severe rule first, in a single pass."""
+    groups: dict[tuple[str, str], list] = {}
+    for finding in findings:
+        group = groups.get((finding.severity, finding.message))
+        if group is None:
+            groups[(finding.severity, finding.message)] = [{finding.path: 1}, 1, finding]
+            continue
+        group[0][finding.path] = group[0].get(finding.path, 0) + 1
+        group[1] += 1
+    ordered = sorted(groups.items(), key=lambda item: SEVERITY_RANK.get(item[0][0], 4))
+    return [
+        FindingGroup(severity, message, paths, count, first)
+        for (severity, message), (paths, count, first) in ordered
+    ]
+
+
+def format_group(group: FindingGroup, max_paths: int = 3) -> str:
+    if group.count == 1:
+        return escape_markers(str(group.first))
+    shown = ", ".join(
+        escape_markers(path if count == 1 else f"{path} ×{count}")
+        for path, count in list(group.paths.items())[:max_paths]
+    )
+    if len(group.paths) > max_paths:
+        shown += f", +{len(group.paths) - max_paths} more"
+    return (
+        f"{group.severity.upper()}: {group.message} — {group.count} occurrences in {len(group.paths)} file(s) ({shown})"
+    )
+
+
+def render_findings(
+    builder: CommentBuilder, findings: list, max_groups: int = 15, empty: str = "- No issues detected."
+) -> None:
+    """Write one bullet per finding group, then an exact count of the groups/findings left out."""
+    groups = group_findings(findings)
+    if not groups:
+        builder.write(empty)
+        return
+
+    shown = 0
+    for group in groups[:max_groups]:
+        if not builder.write(("\n" if shown else "") + f"- {format_group(group)}", reserve=TRAILER_RESERVE):
+            break
+        shown += 1
+
+    hidden = groups[shown:]
+    if hidden:
+        builder.write(
+            ("\n" if shown else "")
+            + f"- … and {sum(group.count for group in hidden)} more finding(s) in {len(hidden)} more group(s)"
+        )
+
+
+def render_code_block(builder: CommentBuilder, text: str, language: str = "text") -> None:
+    """Write ``text`` as a fenced block, truncating it so the closing fence always fits."""
+    builder.write(f"```{language}\n")
+    closing = "\n```"
+    inner = CommentBuilder(max(0, builder.remaining - len(closing.encode("utf-8"))))
+    inner.write_truncated(text)
+    builder.write(inner.getvalue())
+    builder.write(closing)
+
+
+def unchanged(existing_body: Optional[str], body: str) -> bool:
+    """Compare by embedded hash markers when both bodies carry one, else by full content."""
+    if not isinstance(existing_body, str):
+        return False
+    existing_hash, new_hash = embedded_hash(existing_body), embedded_hash(body)
+    if existing_hash and new_hash:
+        return existing_hash == new_hash
+    return body_digest(existing_body) == body_digest(body)
@@ -0,0 +1,72 @@
+"""Compile gitignore-style path globs into a single regular expression."""
+
+import re
+from typing import Iterable
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate one glob into a regex fragment matching repository-relative paths.
+
+    Follows the ``.gitignore``/``.gitattributes`` conventions: a pattern without a slash
+    matches the basename at any depth, a leading slash anchors it at the root, a trailing
+    slash matches everything below a directory, and ``**`` spans directories.
+    """
+    directory = pattern.endswith("/")
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+
+    out: list[str] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(char))
+        i += 1
+
+    regex = "".join(out)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    if directory:
+        regex += "/.*"
+    else:
+        regex += "(?:/.*)?"
+    return regex
+
+
+class GlobSet:
+    """A set of globs matched with one compiled regex; an empty set matches nothing."""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns = tuple(pattern.strip() for pattern in patterns if pattern and pattern.strip())
+        if self.patterns:
+            self._regex = re.compile("|".join(f"(?:{glob_to_regex(pattern)})" for pattern in self.patterns))
+        else:
+            self._regex = None
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, path: str) -> bool:
+        return self._regex is not None and self._regex.fullmatch(path) is not None
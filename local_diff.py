@@ -0,0 +1,256 @@
+"""Diffs computed from a local git checkout instead of the GitHub files/compare API.
+
+``git diff`` output is spooled to a temporary file and memory-mapped, then split into
+per-file byte ranges. Scanners read their patch straight from the mapping, so large diffs are
+never held as one Python string, and the ranges can be fanned out to a process pool where each
+worker maps the same file.
+"""
+
+import codecs
+import hashlib
+import mmap
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+# Below this many bytes of patches, a process pool costs more than it saves.
+PARALLEL_MIN_BYTES = 512 * 1024
+
+# Pin the output format the parser relies on, whatever the user's git config says:
+# ``a/``/``b/`` path prefixes (diff.noprefix, diff.mnemonicPrefix) and raw content (textconv).
+_DIFF_FORMAT_CONFIG = ("-c", "diff.noprefix=false", "-c", "diff.mnemonicPrefix=false")
+_DIFF_FORMAT_ARGS = ("--no-color", "--no-ext-diff", "--no-textconv", "--no-renames")
+
+
+class GitError(RuntimeError):
+    pass
+
+
+class DiffFile(NamedTuple):
+    """One file of a spooled diff; quacks like PyGithub's ``File`` for the fields the tools read."""
+
+    filename: str
+    status: str
+    additions: int
+    deletions: int
+    # Byte range of the patch (from the first ``@@`` line) inside the spooled diff.
+    start: int
+    end: int
+    # sha256 of those bytes, for caching per-file results.
+    digest: bytes = b""
+
+    @property
+    def changes(self) -> int:
+        return self.additions + self.deletions
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+def git(repo_dir: str, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-c", "core.quotePath=false", *args],
+        cwd=repo_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def merge_base(repo_dir: str, base: str, head: str) -> str:
+    return git(repo_dir, "merge-base", base, head).strip()
+
+
+def count_commits(repo_dir: str, base: str, head: str) -> int:
+    return int(git(repo_dir, "rev-list", "--count", f"{base}..{head}").strip() or 0)
+
+
+def read_blob(repo_dir: str, rev: str, path: str) -> Optional[str]:
+    try:
+        return git(repo_dir, "show", f"{rev}:{path}")
+    except GitError:
+        return None
+
+
+def _unquote(path: bytes) -> str:
+    # git C-quotes paths with control characters, quotes or backslashes.
+    if path.startswith(b'"') and path.endswith(b'"'):
+        return codecs.escape_decode(path[1:-1])[0].decode("utf-8", "replace")
+    return path.decode("utf-8", "replace")
+
+
+def _header_path(line: bytes) -> Optional[str]:
+    # "diff --git a/<path> b/<path>"; renames are disabled, so both halves are equal.
+    rest = line[len(b"diff --git "):]
+    half = (len(rest) - 1) // 2
+    if rest[half:half + 1] != b" ":
+        return None
+    return _unquote(rest[half + 1:])[2:]
+
+
+def _side_path(line: bytes) -> Optional[str]:
+    path = line[4:].rstrip(b"\t")
+    if path == b"/dev/null":
+        return None
+    return _unquote(path)[2:]
+
+
+def index_diff(buf) -> list[tuple[str, str, int, int]]:
+    """Split ``git diff`` output into ``(path, status, patch_start, patch_end)`` without copying patches."""
+    sections = []
+    position = 0 if buf[:11] == b"diff --git " else buf.find(b"\ndiff --git ")
+    while position != -1:
+        if buf[position:position + 1] == b"\n":
+            position += 1
+        next_section = buf.find(b"\ndiff --git ", position)
+        end = len(buf) if next_section == -1 else next_section
+        sections.append((position, end))
+        position = next_section
+
+    files = []
+    for start, end in sections:
+        hunk = buf.find(b"\n@@", start, end)
+        header_end = end if hunk == -1 else hunk
+        header = buf[start:header_end].split(b"\n")
+        path = _header_path(header[0])
+        status = "modified"
+        for line in header[1:]:
+            if line.startswith(b"new file mode"):
+                status = "added"
+            elif line.startswith(b"deleted file mode"):
+                status = "removed"
+            elif line.startswith(b"--- ") and status == "removed":
+                path = _side_path(line) or path
+            elif line.startswith(b"+++ "):
+                path = _side_path(line) or path
+        if path is None:
+            continue
+        if hunk == -1:
+            files.append((path, status, end, end))
+        else:
+            patch_end = end - 1 if buf[end - 1:end] == b"\n" else end
+            files.append((path, status, hunk + 1, max(hunk + 1, patch_end)))
+    return files
+
+
+def numstat(repo_dir: str, base: str, head: str) -> dict[str, tuple[int, int]]:
+    output = git(repo_dir, *_DIFF_FORMAT_CONFIG, "diff", "--numstat", "-z", *_DIFF_FORMAT_ARGS, base, head)
+    stats = {}
+    for record in output.split("\0"):
+        if not record:
+            continue
+        added, deleted, path = record.split("\t", 2)
+        stats[path] = (int(added) if added != "-" else 0, int(deleted) if deleted != "-" else 0)
+    return stats
+
+
+_worker_buf = None
+_worker_memo = None
+
+
+def _map_file(path: str):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as handle:
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _init_worker(path: str, memo=None) -> None:
+    global _worker_buf, _worker_memo
+    _worker_buf = _map_file(path)
+    # Each worker keeps its own copy of the memo for every batch it runs.
+    _worker_memo = memo
+
+
+def _scan_ranges(scan: Callable, ranges: list[tuple[str, int, int]], buf=None, memo=None) -> list[tuple[str, list]]:
+    if buf is None:
+        buf, memo = _worker_buf, _worker_memo
+    return [
+        (path, [tuple(item) for item in scan(path, buf[start:end].decode("utf-8", "replace"), memo)])
+        for path, start, end in ranges
+    ]
+
+
+def _batches(files: list[DiffFile], count: int) -> list[list[tuple[str, int, int]]]:
+    # Largest first into the lightest batch keeps workers evenly loaded.
+    batches: list[list[tuple[str, int, int]]] = [[] for _ in range(count)]
+    loads = [0] * count
+    for changed_file in sorted(files, key=lambda item: item.size, reverse=True):
+        lightest = loads.index(min(loads))
+        batches[lightest].append((changed_file.filename, changed_file.start, changed_file.end))
+        loads[lightest] += changed_file.size
+    return [batch for batch in batches if batch]
+
+
+class SpooledDiff:
+    """``git diff base head`` written to a temp file and memory-mapped for the life of the context."""
+
+    def __init__(self, repo_dir: str, base: str, head: str):
+        self.repo_dir = repo_dir
+        self.base = base
+        self.head = head
+        self.path = ""
+        self.buf = b""
+        self.files: list[DiffFile] = []
+
+    def __enter__(self) -> "SpooledDiff":
+        handle, self.path = tempfile.mkstemp(prefix="mcp-diff-", suffix=".patch")
+        try:
+            with os.fdopen(handle, "wb") as spool:
+                result = subprocess.run(
+                    ["git", "-c", "core.quotePath=false", *_DIFF_FORMAT_CONFIG, "diff", *_DIFF_FORMAT_ARGS,
+                     "--src-prefix=a/", "--dst-prefix=b/", self.base, self.head],
+                    cwd=self.repo_dir,
+                    stdout=spool,
+                    stderr=subprocess.PIPE,
+                )
+            if result.returncode != 0:
+                raise GitError(f"git diff failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+            self.buf = _map_file(self.path)
+            stats = numstat(self.repo_dir, self.base, self.head)
+            with memoryview(self.buf) as view:
+                self.files = [
+                    DiffFile(
+                        path, status, *stats.get(path, (0, 0)), start, end, hashlib.sha256(view[start:end]).digest()
+                    )
+                    for path, status, start, end in index_diff(self.buf)
+                ]
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self.buf = b""
+        if self.path:
+            os.unlink(self.path)
+            self.path = ""
+
+    def scan(self, files: list[DiffFile], scan: Callable, jobs: Optional[int] = None, memo=None) -> dict[str, list]:
+        """Run ``scan(path, patch, memo)`` for every file; results are plain tuples keyed by path.
+
+        ``scan`` must be a module-level function so worker processes can import it. ``memo`` is
+        shared by every file of a serial scan; with a pool, each worker starts from a copy.
+        """
+        jobs = jobs or os.cpu_count() or 1
+        if jobs <= 1 or len(files) < 2 or sum(item.size for item in files) < PARALLEL_MIN_BYTES:
+            return dict(
+                _scan_ranges(scan, [(item.filename, item.start, item.end) for item in files], self.buf, memo)
+            )
+
+        results: dict[str, list] = {}
+        batches = _batches(files, jobs * 4)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.path, memo)) as pool:
+            for batch_result in pool.map(_scan_ranges, [scan] * len(batches), batches):
+                results.update(batch_result)
+        return results
@@ -10,8 +10,14 @@ MCP_AUTH_TOKEN = os.getenv("MCP_AUTH_TOKEN", "")
 print(f"[DEBUG] REQUIRE_MCP_AUTH_RAW={REQUIRE_MCP_AUTH_RAW!r} REQUIRE_MCP_AUTH={REQUIRE_MCP_AUTH!r} MCP_AUTH_TOKEN={MCP_AUTH_TOKEN!r}")
 
 # Guard: fail if REQUIRE_MCP_AUTH is enabled but MCP_AUTH_TOKEN is missing or only whitespace
-if REQUIRE_MCP_AUTH and not (MCP_AUTH_TOKEN and MCP_AUTH_TOKEN.strip()):
-    raise RuntimeError("REQUIRE_MCP_AUTH is enabled but MCP_AUTH_TOKEN is missing")
+from startup_guards import (
+    check_github_token,
+    check_mcp_auth,
+    check_session_backend,
+    check_token_store,
+    default_session_backend,
+)
+check_mcp_auth(REQUIRE_MCP_AUTH, MCP_AUTH_TOKEN)
 
 # Guard: fail if GITHUB_TOKEN is missing or a known placeholder
 
@@ -20,18 +26,27 @@ import re
 import hashlib
 import hmac
 import logging
+import threading
 from urllib.parse import quote
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional
 from fastapi import FastAPI, Request, Response, Depends, HTTPException
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from fastapi.responses import RedirectResponse, HTMLResponse
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.config import Config
 from starlette.middleware.cors import CORSMiddleware
 from authlib.integrations.starlette_client import OAuth, OAuthError
-from github import Github
+from github import Auth, Github, GithubException
+from cachetools import LRUCache
+import comment_render
+import pattern_index
+import review_rules
+from session_store import add_session_middleware, rotate_session, session_backend_from_uri
+from tenant_clients import GithubClientCache, TokenStore, derive_encryption_key
+from rate_limits import RATE_LIMIT_DEFAULT, build_limiter, tool_cost
+from path_filter import DEFAULT_MAX_PATCH_BYTES, DEFAULT_SKIP_GLOBS, PathPrefilter, PrefilterStats
+from risk_store import DIMENSIONS as ANALYTICS_DIMENSIONS, ORDER_BY as ANALYTICS_ORDER_BY, RiskStore, clamp_days
 
 # --- Load env and assign variables ---
 logger = logging.getLogger(__name__)
@@ -41,10 +56,7 @@ GITHUB_CLIENT_ID = os.getenv("GITHUB_CLIENT_ID", "")
 GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET", "")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
 # Guard: fail if GITHUB_TOKEN is missing or a known placeholder
-if GITHUB_TOKEN in ("your_token_here", "ci_selfcheck_token_value_12345", "ci_selfcheck_token_value_67890"):
-    raise RuntimeError("Missing required GITHUB_TOKEN: GITHUB_TOKEN is set to a placeholder value")
-if not GITHUB_TOKEN:
-    raise RuntimeError("Missing required GITHUB_TOKEN")
+check_github_token(GITHUB_TOKEN)
 
 # --- OAuth setup ---
 config = Config(environ=os.environ)
@@ -85,12 +97,18 @@ else:
     # Default: allow only production domain, fallback to all for dev
     allowed_origins = ["https://stefano-mcp-pro.fly.dev"] if os.getenv("ENV") == "production" else ["*"]
 
+# --- Sessions: server-side (the cookie only carries an opaque id), or signed cookies for cookie:// ---
+SESSION_BACKEND = os.getenv("SESSION_BACKEND") or default_session_backend(os.environ)
+# Guard: fail if a deployed config would keep sessions on one machine
+check_session_backend(SESSION_BACKEND, os.environ)
+_session_backend = session_backend_from_uri(SESSION_BACKEND)
+
 # --- Rate limiting setup ---
-limiter = Limiter(key_func=get_remote_address, default_limits=["60/minute"])
+limiter = build_limiter(auth_tokens=(MCP_AUTH_TOKEN,))
 app = FastAPI()
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+add_session_middleware(app, _session_backend, SECRET_KEY, https_only=os.getenv("ENV") == "production")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -136,64 +154,114 @@ def _sanitize_error(msg: str) -> str:
     return token_pattern.sub("[REDACTED_TOKEN]", msg)
 
 
-_GITHUB_TOKEN_PATTERN = re.compile(r"gh[p]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,}")
 _SAFE_TOKEN_PATHS = frozenset({"readme.md", ".env.example", "scripts/security_selfcheck.py"})
 
 
+_keyword_index = pattern_index.ReloadableIndex(os.getenv("MCP_KEYWORDS_FILE") or None)
+
+
 def _is_placeholder_token(path: str, line: str, token_value: str) -> bool:
     lowered_line = line.lower()
+    token_start = lowered_line.find(token_value.lower())
+    token_end = token_start + len(token_value)
 
-    if (
-        "exampletoken" in token_value.lower()
-        or "your_token_here" in lowered_line
-        or "replace_with_real_token" in lowered_line
-        or "<real-github-token>" in lowered_line
-    ):
-        return True
+    for start, end, categories in _keyword_index.get().scan(lowered_line):
+        if pattern_index.PLACEHOLDER_LINE in categories:
+            return True
+        if pattern_index.PLACEHOLDER_TOKEN in categories and token_start <= start and end <= token_end:
+            return True
 
     return path.lower() in _SAFE_TOKEN_PATHS
 
 
-def _build_findings(path: str, patch: str) -> list[str]:
-    findings: list[str] = []
+def _keep_unless_placeholder(path: str, line: str, token_value: str) -> bool:
+    return not _is_placeholder_token(path, line, token_value)
+
+
+_RULES_FILE = os.getenv("MCP_RULES_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "default.toml")
+_rule_pack = review_rules.ReloadableRulePack(_RULES_FILE, filters={"placeholder_token": _keep_unless_placeholder})
+# Keyed by ``_findings_version``, so editing the rules or keywords invalidates every cached result.
+_findings_cache: LRUCache = LRUCache(maxsize=4096)
+_findings_cache_lock = threading.Lock()
+
+
+def _findings_version(pack: Optional[review_rules.RulePack] = None) -> str:
+    """Rule pack version plus the keyword index version the ``placeholder_token`` filter reads."""
+    pack = pack or _rule_pack.get()
+    return f"{pack.version}:{_keyword_index.get().version}"
+
+
+class Finding(NamedTuple):
+    severity: str
+    path: str
+    message: str
+    line: Optional[int] = None
+
+    def __str__(self) -> str:
+        return f"{self.severity.upper()}: {comment_render.escape_markers(self.path)} {self.message}"
+
+
+def _patch_digest(patch: str) -> bytes:
+    return hashlib.sha256(patch.encode("utf-8", "surrogatepass")).digest()
+
+
+# Files the prefilter skips are still checked against these rules, so a path or a
+# ``.gitattributes`` entry can't keep e.g. an ``eval()`` away from the quality gate.
+SKIPPED_FILE_SEVERITIES = ("critical", "major")
+
+
+def _scan_file(
+    path: str,
+    patch: str,
+    memo: Optional[review_rules.ScanMemo] = None,
+    severities: Optional[tuple[str, ...]] = None,
+) -> list[Finding]:
     if not patch:
-        return findings
+        return []
 
-    if "console.log" in patch.lower():
-        findings.append(f"MINOR: {path} contains console.log")
+    pack = _rule_pack.get()
+    key = (_findings_version(pack), path, _patch_digest(patch), severities)
+    with _findings_cache_lock:
+        cached = _findings_cache.get(key)
+    if cached is None:
+        cached = tuple(
+            Finding(hit.rule.severity, path, hit.rule.message, hit.line)
+            for hit in pack.scan(path, patch, memo, severities)
+        )
+        with _findings_cache_lock:
+            _findings_cache[key] = cached
+    return list(cached)
 
-    for raw in patch.splitlines():
-        if not raw.startswith("+") or raw.startswith("+++"):
-            continue
 
-        line = raw[1:]
-        stripped = line.strip()
+def _scan_skipped_file(path: str, patch: str, memo: Optional[review_rules.ScanMemo] = None) -> list[Finding]:
+    return _scan_file(path, patch, memo, SKIPPED_FILE_SEVERITIES)
 
-        if "findings.append(" in stripped and (
-            "eval() added" in stripped
-            or "potential hardcoded GitHub token" in stripped
-        ):
-            continue
 
-        if re.search(r"(?<!['\"])\beval\s*\(", line):
-            findings.append(f"CRITICAL: {path} eval() added")
-        if re.search(r"(?<!['\"])\bdebugger\b", line):
-            findings.append(f"MAJOR: {path} debugger statement added")
-        if re.search(r"^\s*except\s*:\s*$", line):
-            findings.append(f"MAJOR: {path} bare except detected")
+def _build_findings(path: str, patch: str) -> list[str]:
+    return [str(finding) for finding in _scan_file(path, patch)]
 
-        token_match = _GITHUB_TOKEN_PATTERN.search(line)
-        if token_match:
-            token_value = token_match.group(0)
-            if not _is_placeholder_token(path, line, token_value):
-                findings.append(f"CRITICAL: {path} potential hardcoded GitHub token")
 
-        if "password" in stripped.lower() and "=" in stripped and '"' in stripped:
-            findings.append(f"MAJOR: {path} possible hardcoded password")
-        if "todo" in stripped.lower() or "fixme" in stripped.lower():
-            findings.append(f"INFO: {path} TODO/FIXME added")
+MCP_SKIP_GLOBS = tuple(glob.strip() for glob in os.getenv("MCP_SKIP_GLOBS", "").split(",") if glob.strip())
+MCP_MAX_PATCH_BYTES = int(os.getenv("MCP_MAX_PATCH_BYTES", str(DEFAULT_MAX_PATCH_BYTES)))
 
-    return findings
+
+def _build_prefilter(gh_repo, ref: str) -> PathPrefilter:
+    attributes = ""
+    try:
+        content = getattr(gh_repo.get_contents(".gitattributes", ref=ref), "decoded_content", b"")
+        if isinstance(content, bytes):
+            attributes = content.decode("utf-8", "replace")
+    except GithubException:
+        pass
+    return _prefilter_from_attributes(attributes)
+
+
+def _prefilter_from_attributes(attributes: str) -> PathPrefilter:
+    return PathPrefilter.from_gitattributes(
+        attributes,
+        skip_globs=(*DEFAULT_SKIP_GLOBS, *MCP_SKIP_GLOBS),
+        max_patch_bytes=MCP_MAX_PATCH_BYTES,
+    )
 
 
 def _summarize_findings(findings: list[str]) -> Counter:
@@ -210,17 +278,107 @@ def _summarize_findings(findings: list[str]) -> Counter:
     return counts
 
 
-def _upsert_issue_comment(pr, marker: str, body: str) -> None:
-    existing = None
+# Writes made and avoided (unchanged comment bodies, repeated reviews) since the process started.
+_write_stats: Counter = Counter()
+_write_stats_lock = threading.Lock()
+
+
+def _count_write(kind: str) -> None:
+    with _write_stats_lock:
+        _write_stats[kind] += 1
+
+
+def _find_issue_comment(pr, marker: str, comment_ids: Optional[dict] = None):
+    """Return the comment carrying ``marker``, or ``None``.
+
+    ``comment_ids`` maps markers to known comment ids (e.g. from the Actions cache) so the
+    comment can be fetched directly instead of paging through every issue comment.
+    """
+    known_id = (comment_ids or {}).get(marker)
+    if isinstance(known_id, int):
+        try:
+            comment = pr.get_issue_comment(known_id)
+            if comment.body and marker in comment.body:
+                return comment
+        except GithubException:
+            pass
+
     for comment in pr.get_issue_comments():
         if comment.body and marker in comment.body:
-            existing = comment
-            break
-
-    if existing:
-        existing.edit(body)
+            return comment
+    return None
+
+
+def _write_issue_comment(pr, marker: str, body: str, existing, comment_ids: Optional[dict] = None) -> bool:
+    """Create or edit the marker comment; skipped when its embedded hash matches. Returns whether it wrote."""
+    body = comment_render.with_hash(body)
+    written = True
+    if existing is None:
+        existing = pr.create_issue_comment(body)
+        _count_write("comment_created")
+    elif comment_render.unchanged(existing.body, body):
+        written = False
+        _count_write("comment_skipped")
     else:
-        pr.create_issue_comment(body)
+        existing.edit(body)
+        _count_write("comment_edited")
+
+    if comment_ids is not None and isinstance(getattr(existing, "id", None), int):
+        comment_ids[marker] = existing.id
+    return written
+
+
+def _upsert_issue_comment(pr, marker: str, body: str, comment_ids: Optional[dict] = None) -> bool:
+    """Edit the comment carrying ``marker`` or create it."""
+    return _write_issue_comment(pr, marker, body, _find_issue_comment(pr, marker, comment_ids), comment_ids)
+
+
+# --- Per-user tokens and warm GitHub clients ---
+MCP_TENANT_ID = os.getenv("MCP_TENANT_ID", "default")
+MCP_TOKEN_STORE = os.getenv("MCP_TOKEN_STORE", ":memory:")
+TOKEN_ENCRYPTION_KEY = os.getenv("TOKEN_ENCRYPTION_KEY", "")
+# Guard: fail if a token file would be encrypted with a key derived from the public default SECRET_KEY
+check_token_store(MCP_TOKEN_STORE, TOKEN_ENCRYPTION_KEY, SECRET_KEY)
+_token_store = TokenStore(MCP_TOKEN_STORE, TOKEN_ENCRYPTION_KEY.encode("ascii") or derive_encryption_key(SECRET_KEY))
+_github_clients = GithubClientCache(
+    lambda token: Github(auth=Auth.Token(token), pool_size=int(os.getenv("GITHUB_POOL_SIZE", "10"))),
+    maxsize=int(os.getenv("GITHUB_CLIENT_CACHE_SIZE", "256")),
+)
+
+
+def _github_client(login: Optional[str] = None, fallback: bool = True):
+    """Return a cached client for ``login``'s stored OAuth token, else (if ``fallback``) the GITHUB_TOKEN one."""
+    if login:
+        token = _token_store.get(MCP_TENANT_ID, login)
+        if token:
+            return _github_clients.get(MCP_TENANT_ID, login, token)
+    if not fallback:
+        return None
+    return _github_clients.get(MCP_TENANT_ID, "", GITHUB_TOKEN)
+
+
+# --- Historical risk analytics (opt-in via MCP_ANALYTICS_DB) ---
+MCP_ANALYTICS_DB = os.getenv("MCP_ANALYTICS_DB", "")
+_risk_store: Optional[RiskStore] = RiskStore(MCP_ANALYTICS_DB) if MCP_ANALYTICS_DB else None
+
+
+def _record_result(kind: str, repo: str, pr_id: int, pr, **fields) -> None:
+    if _risk_store is None:
+        return
+
+    author = getattr(getattr(pr, "user", None), "login", "")
+    head_sha = getattr(getattr(pr, "head", None), "sha", "")
+    try:
+        _risk_store.record(
+            kind,
+            repo,
+            pr_id,
+            author=author if isinstance(author, str) else "",
+            head_sha=head_sha if isinstance(head_sha, str) else "",
+            **fields,
+        )
+    except Exception as exc:
+        logger.warning("Analytics record failed (non-fatal): %s", _sanitize_error(str(exc)))
 
 
 # --- Multi-tenant FastAPI app with GitHub OAuth ---
@@ -228,77 +386,151 @@ import os
 import re
 import hashlib
 import hmac
-def review_pr(repo: str, pr_id: int):
-    gh = Github(GITHUB_TOKEN)
-    gh_repo = gh.get_repo(repo)
-    pr = gh_repo.get_pull(pr_id)
-
-    findings: list[str] = []
+@dataclass
+class PRAnalysis:
+    """One scan of a PR's files, shared by the review, risk and quality-gate steps."""
+    head_sha: str
+    files: list
+    findings: list[Finding]
+    inline_comments: list[dict[str, object]]
+    counts: Counter
+    skipped: PrefilterStats
+    findings_by_file: dict[str, list[Finding]] = field(default_factory=dict)
+    # Skipped files that were only checked against SKIPPED_FILE_SEVERITIES.
+    partial: frozenset[str] = frozenset()
+
+
+def _build_analysis(
+    head_sha: str, files: list, scanned: list, skipped: PrefilterStats, partial: frozenset[str] = frozenset()
+) -> PRAnalysis:
+    """Assemble a PRAnalysis from ``(changed_file, findings)`` pairs, whatever produced them."""
+    findings: list[Finding] = []
+    findings_by_file: dict[str, list[Finding]] = {}
     inline_comments: list[dict[str, object]] = []
 
-    for changed_file in pr.get_files():
-        file_findings = _build_findings(changed_file.filename, changed_file.patch or "")
+    for changed_file, file_findings in scanned:
+        findings_by_file[changed_file.filename] = file_findings
         findings.extend(file_findings)
 
-        if not file_findings:
-            continue
-
         for finding in file_findings[:3]:
             inline_comments.append(
                 {
                     "path": changed_file.filename,
-                    "line": changed_file.changes if changed_file.changes else 1,
+                    "line": finding.line or changed_file.changes or 1,
                     "side": "RIGHT",
                     "body": f"🤖 {finding}",
                 }
             )
 
-    counts = _summarize_findings(findings)
+    return PRAnalysis(
+        head_sha=head_sha,
+        files=files,
+        findings=findings,
+        inline_comments=inline_comments,
+        counts=_summarize_findings([str(finding) for finding in findings]),
+        skipped=skipped,
+        findings_by_file=findings_by_file,
+        partial=partial,
+    )
+
+
+def _analyze_pr(gh_repo, pr) -> PRAnalysis:
+    files = list(pr.get_files())
+    skipped = PrefilterStats()
+    memo = review_rules.ScanMemo()
+    scanned = []
+    partial = set()
+    # Attributes come from the base so a PR can't mark its own files generated to dodge the scan.
+    for changed_file, reason in _build_prefilter(gh_repo, pr.base.sha).classify(files, skipped):
+        if reason is None:
+            scanned.append((changed_file, _scan_file(changed_file.filename, changed_file.patch or "", memo)))
+        elif changed_file.patch:
+            partial.add(changed_file.filename)
+            scanned.append((changed_file, _scan_skipped_file(changed_file.filename, changed_file.patch, memo)))
+
+    if memo.lines_seen:
+        logger.info("PR #%s scanned %s unique of %s added line(s)", pr.number, memo.lines_matched, memo.lines_seen)
+    if skipped.files_skipped:
+        logger.info("PR #%s prefilter skipped %s", pr.number, skipped.summary())
+
+    return _build_analysis(pr.head.sha, files, scanned, skipped, frozenset(partial))
+
+
+def _publish_review(gh_repo, pr, repo: str, pr_id: int, analysis: PRAnalysis, comment_ids: Optional[dict] = None) -> str:
+    findings = analysis.findings
+    counts = analysis.counts
+    skipped = analysis.skipped
     has_critical = counts.get("critical", 0) > 0
+    _record_result(
+        "review", repo, pr_id, pr,
+        counts=counts,
+        files=len(analysis.files),
+        additions=sum(getattr(changed_file, "additions", 0) or 0 for changed_file in analysis.files),
+        deletions=sum(getattr(changed_file, "deletions", 0) or 0 for changed_file in analysis.files),
+    )
 
     marker = "<!-- mcp-review-summary -->"
-    top_findings = "\n".join(f"- {item}" for item in findings[:15]) or "- No issues detected."
-    summary_body = (
+    existing = _find_issue_comment(pr, marker, comment_ids)
+    # The last review this bot published is recorded in the summary comment, so re-runs on the
+    # same commit (e.g. push and pull_request events for one push) don't repeat it.
+    state = comment_render.parse_review_state(getattr(existing, "body", None))
+
+    review = None
+    if has_critical and analysis.inline_comments:
+        blocking_reviews_enabled = os.getenv("MCP_ENABLE_BLOCKING_REVIEWS", "false").lower() == "true"
+        event = "REQUEST_CHANGES" if blocking_reviews_enabled else "COMMENT"
+        review = {
+            "body": "🤖 GitHub MCP Pro inline findings",
+            "event": event,
+            "comments": analysis.inline_comments,
+        }
+        review_state = comment_render.review_state(event, analysis.head_sha, repr(analysis.inline_comments))
+    elif not has_critical:
+        # Publish an approval so any previous bot-requested changes are superseded.
+        review = {"body": "🤖 GitHub MCP Pro review passed: no critical findings.", "event": "APPROVE"}
+        review_state = comment_render.review_state("APPROVE", analysis.head_sha)
+
+    if review is not None and review_state == state:
+        _count_write("review_skipped")
+    elif review is not None:
+        try:
+            pr.create_review(commit=gh_repo.get_commit(analysis.head_sha), **review)
+            _count_write("review_created")
+            state = review_state
+        except Exception as exc:
+            logger.warning("Inline review failed (non-fatal): %s", _sanitize_error(str(exc)))
+
+    skipped_line = f"- Skipped (critical/major rules only): {skipped.summary()}\n" if skipped.files_skipped else ""
+    builder = comment_render.CommentBuilder()
+    builder.write(
         f"{marker}\n"
         f"**🤖 GitHub MCP Pro Review — PR #{pr_id}**\n\n"
-        f"- Findings: critical {counts['critical']}, major {counts['major']}, minor {counts['minor']}, info {counts['info']}\n\n"
+        f"- Findings: critical {counts['critical']}, major {counts['major']}, minor {counts['minor']}, info {counts['info']}\n"
+        f"{skipped_line}\n"
         f"**Top findings**\n"
-        f"{top_findings}"
     )
-    _upsert_issue_comment(pr, marker, summary_body)
-
-    try:
-        if has_critical and inline_comments:
-            blocking_reviews_enabled = os.getenv("MCP_ENABLE_BLOCKING_REVIEWS", "false").lower() == "true"
-            pr.create_review(
-                commit=gh_repo.get_commit(pr.head.sha),
-                body="🤖 GitHub MCP Pro inline findings",
-                event="REQUEST_CHANGES" if blocking_reviews_enabled else "COMMENT",
-                comments=inline_comments,
-            )
-        elif not has_critical:
-            # Always publish an approval so any previous bot-requested changes are superseded.
-            pr.create_review(
-                commit=gh_repo.get_commit(pr.head.sha),
-                body="🤖 GitHub MCP Pro review passed: no critical findings.",
-                event="APPROVE",
-            )
-    except Exception as exc:
-        logger.warning("Inline review failed (non-fatal): %s", _sanitize_error(str(exc)))
+    comment_render.render_findings(builder, findings, max_groups=15)
+    if state:
+        builder.write(f"\n{comment_render.review_state_marker(state)}")
+    _write_issue_comment(pr, marker, builder.getvalue(), existing, comment_ids)
 
     status_emoji = "❌" if has_critical else "✅"
     return (
         f"{status_emoji} PR #{pr_id} reviewed: {len(findings)} finding(s) "
         f"(critical:{counts['critical']}, major:{counts['major']}, "
         f"minor:{counts['minor']}, info:{counts['info']}) reported."
+        + (f" Skipped {skipped.summary()}." if skipped.files_skipped else "")
     )
 
-def assess_pr_risk(repo: str, pr_id: int):
-    gh = Github(GITHUB_TOKEN)
+
+def review_pr(repo: str, pr_id: int):
+    gh = _github_client()
     gh_repo = gh.get_repo(repo)
     pr = gh_repo.get_pull(pr_id)
-    files = list(pr.get_files())
+    return _publish_review(gh_repo, pr, repo, pr_id, _analyze_pr(gh_repo, pr))
 
+
+def _publish_risk(pr, repo: str, pr_id: int, files: list, comment_ids: Optional[dict] = None) -> str:
     score = 0
     factors: list[str] = []
 
@@ -318,15 +550,14 @@ def assess_pr_risk(repo: str, pr_id: int):
         score += 10
         factors.append(f"+10 medium additions ({additions} lines)")
 
-    sensitive = [
-        file.filename for file in files
-        if any(k in file.filename.lower() for k in ("auth", "token", "secret", "crypto", "password", "login"))
-    ]
+    keyword_index = _keyword_index.get()
+    path_classes = [(file.filename, keyword_index.classify(file.filename)) for file in files]
+    sensitive = [name for name, classes in path_classes if pattern_index.SENSITIVE_PATH in classes]
     if sensitive:
         score += 20
         factors.append(f"+20 sensitive files touched ({', '.join(sensitive[:3])})")
 
-    if any("test" in file.filename.lower() for file in files):
+    if any(pattern_index.TEST_PATH in classes for _, classes in path_classes):
         score -= 10
         factors.append("-10 test coverage included")
 
@@ -345,18 +576,53 @@ def assess_pr_risk(repo: str, pr_id: int):
     )
 
     marker = "<!-- mcp-risk-assessment -->"
-    body = f"{marker}\n**🤖 Automated PR Risk Assessment**\n\n```text\n{result}\n```"
-    _upsert_issue_comment(pr, marker, body)
+    builder = comment_render.CommentBuilder()
+    builder.write(f"{marker}\n**🤖 Automated PR Risk Assessment**\n\n")
+    comment_render.render_code_block(builder, result)
+    _upsert_issue_comment(pr, marker, builder.getvalue(), comment_ids)
+    _record_result(
+        "risk", repo, pr_id, pr,
+        score=score, level=level, factors=factors, files=file_count, additions=additions,
+        deletions=sum(getattr(file, "deletions", 0) or 0 for file in files),
+    )
     return result
+
+
+def assess_pr_risk(repo: str, pr_id: int):
+    gh = _github_client()
+    gh_repo = gh.get_repo(repo)
+    pr = gh_repo.get_pull(pr_id)
+    return _publish_risk(pr, repo, pr_id, list(pr.get_files()))
+
+def risk_analytics(dimension: str = "repo", days: int = 30, order_by: str = "avg_risk", limit: int = 10):
+    if _risk_store is None:
+        return "Risk analytics disabled: set MCP_ANALYTICS_DB to enable the history store."
+    if dimension not in ANALYTICS_DIMENSIONS or order_by not in ANALYTICS_ORDER_BY:
+        return (
+            f"Unsupported dimension or order_by: use dimension one of {', '.join(ANALYTICS_DIMENSIONS)} "
+            f"and order_by one of {', '.join(ANALYTICS_ORDER_BY)}."
+        )
+
+    days = clamp_days(days)
+    rows = _risk_store.top(dimension, days=days, order_by=order_by, limit=limit)
+    if not rows:
+        return f"No review or risk results recorded in the last {days} day(s)."
+
+    lines = [f"Top {len(rows)} {dimension}(s) by {order_by} over the last {days} day(s):"]
+    for row in rows:
+        lines.append(
+            f"- {row['key'] or '(unknown)'}: avg risk {row['avg_risk']}, max {row['max_risk']}, "
+            f"high-risk runs {row['high_risk']}, risk runs {row['risk_runs']}, reviews {row['reviews']}, "
+            f"critical {row['critical']}, major {row['major']}"
+        )
+    return "\n".join(lines)
 import logging
 from urllib.parse import quote
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response, Depends, HTTPException
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from fastapi.responses import RedirectResponse, HTMLResponse
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.config import Config
 from starlette.middleware.cors import CORSMiddleware
 from authlib.integrations.starlette_client import OAuth, OAuthError
@@ -385,11 +651,11 @@ else:
 
 # Security self-check and tests expect this guard:
  # --- Rate limiting setup ---
-limiter = Limiter(key_func=get_remote_address, default_limits=["60/minute"])
+limiter = build_limiter(auth_tokens=(MCP_AUTH_TOKEN,))
 app = FastAPI()
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+add_session_middleware(app, _session_backend, SECRET_KEY, https_only=os.getenv("ENV") == "production")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -399,7 +665,7 @@ app.add_middleware(
 )
 
 @app.get("/")
-@limiter.limit("60/minute")
+@limiter.limit(RATE_LIMIT_DEFAULT)
 async def index(request: Request):
     user = request.session.get('user')
     if user:
@@ -525,6 +791,10 @@ async def index(request: Request):
 
 @app.get("/logout")
 async def logout(request: Request):
+    login_name = (request.session.get('user') or {}).get('login')
+    if login_name:
+        _token_store.delete(MCP_TENANT_ID, login_name)
+        _github_clients.evict(MCP_TENANT_ID, login_name)
     request.session.clear()
     return RedirectResponse(url="/")
 
@@ -541,6 +811,8 @@ async def auth(request: Request):
         token = await oauth.github.authorize_access_token(request)
         user = await oauth.github.get('user', token=token)
         user_info = user.json()
+        if user_info.get('login') and token.get('access_token'):
+            _token_store.put(MCP_TENANT_ID, user_info['login'], token['access_token'])
         # Store user info in session
         request.session['user'] = {
             'login': user_info.get('login'),
@@ -548,6 +820,8 @@ async def auth(request: Request):
             'html_url': user_info.get('html_url'),
             'name': user_info.get('name'),
         }
+        # New id for the authenticated session; a pre-login id planted in the browser stays anonymous.
+        rotate_session(request)
         return RedirectResponse(url="/")
     except OAuthError as e:
         html = f"""
@@ -584,3 +858,48 @@ async def auth(request: Request):
         </html>
         """
         return HTMLResponse(html, status_code=400)
+
+
+def _require_api_auth(request: Request) -> None:
+    if not REQUIRE_MCP_AUTH:
+        return
+    header = request.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), MCP_AUTH_TOKEN):
+        raise HTTPException(status_code=401, detail="Missing or invalid bearer token")
+
+
+@app.get("/analytics/risk")
+@limiter.limit(RATE_LIMIT_DEFAULT, cost=tool_cost("risk_analytics"))
+async def analytics_risk(
+    request: Request,
+    dimension: str = "repo",
+    days: int = 30,
+    order_by: str = "avg_risk",
+    limit: int = 10,
+):
+    _require_api_auth(request)
+    if _risk_store is None:
+        raise HTTPException(status_code=503, detail="Risk analytics disabled: MCP_ANALYTICS_DB is not set")
+    if dimension not in ANALYTICS_DIMENSIONS or order_by not in ANALYTICS_ORDER_BY:
+        raise HTTPException(status_code=400, detail="Unsupported dimension or order_by")
+
+    days = clamp_days(days)
+    rows = _risk_store.top(dimension, days=days, order_by=order_by, limit=min(limit, 100))
+    return {"dimension": dimension, "days": days, "order_by": order_by, "results": rows}
+
+
+@app.get("/my_repos")
+@limiter.limit(RATE_LIMIT_DEFAULT, cost=tool_cost("my_repos"))
+def my_repos(request: Request, limit: int = 50):
+    login_name = (request.session.get('user') or {}).get('login')
+    gh = _github_client(login_name, fallback=False) if login_name else None
+    if gh is None:
+        raise HTTPException(status_code=401, detail="Login with GitHub first")
+
+    repos = []
+    for repo in gh.get_user().get_repos(sort="updated"):
+        repos.append({"full_name": repo.full_name, "private": repo.private, "html_url": repo.html_url})
+        if len(repos) >= min(max(limit, 1), 100):
+            break
+    return {"login": login_name, "repos": repos}
@@ -0,0 +1,550 @@
+"""Command-line entry point for the Auto PR Tools workflow.
+
+    python -m mcp_cli auto                      # decide from the Actions event (env vars)
+    python -m mcp_cli review risk gate --pr 12  # one analysis pass shared by all three steps
+    python -m mcp_cli branch --before A --head B
+
+``--local-repo .`` computes diffs from the checked-out repository (merge-base to head) and
+scans them across cores; the API is then only used to post results.
+
+``--cache-dir`` points at a directory restored/saved with ``actions/cache``. It holds a
+compact gzip'd JSON file per PR/branch with the findings of each file (keyed by patch
+digest, rule pack and keyword index versions), the per-commit results of branch scans and
+the ids of the bot's comments, so later pushes skip rescanning unchanged files or commits
+and paging through comments.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from github import GithubException
+
+import local_diff
+import main as mcp
+import review_rules
+from path_filter import PrefilterStats
+
+logger = logging.getLogger(__name__)
+
+NULL_SHA = "0" * 40
+CACHE_FORMAT = 2
+# Per-commit branch scan results kept across runs; the oldest are dropped first.
+MAX_CACHED_COMMITS = 2000
+# The compare API lists at most this many files and can't page them.
+COMPARE_FILE_LIMIT = 300
+STEPS = ("review", "risk", "gate")
+
+
+class AnalysisCache:
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.data: dict = {"v": CACHE_FORMAT, "rules": "", "files": {}, "commits": {}, "comments": {}}
+        if path is not None and path.exists():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as handle:
+                    loaded = json.load(handle)
+                if loaded.get("v") == CACHE_FORMAT:
+                    self.data.update(loaded)
+            except (OSError, ValueError) as exc:
+                logger.warning("Ignoring unreadable analysis cache %s: %s", path, exc)
+
+    @classmethod
+    def for_scope(cls, cache_dir: Optional[str], repo: str, scope: str) -> "AnalysisCache":
+        if not cache_dir:
+            return cls(None)
+        safe_name = f"{repo}--{scope}".replace("/", "__")
+        return cls(Path(cache_dir) / f"{safe_name}.json.gz")
+
+    def comment_ids(self, pr_id: int) -> dict:
+        return self.data["comments"].setdefault(str(pr_id), {})
+
+    def _sync_rules(self) -> str:
+        """Drop every cached result produced by another rule pack or keyword index version."""
+        version = mcp._findings_version()
+        if self.data["rules"] != version:
+            self.data["rules"] = version
+            self.data["files"] = {}
+            self.data["commits"] = {}
+        return version
+
+    def preload_findings(self) -> int:
+        """Seed the in-process findings cache with the per-file results of earlier runs."""
+        version = self._sync_rules()
+        with mcp._findings_cache_lock:
+            for path, (digest, items) in self.data["files"].items():
+                mcp._findings_cache[(version, path, bytes.fromhex(digest), None)] = tuple(
+                    mcp.Finding(severity, path, message, line) for severity, message, line in items
+                )
+        return len(self.data["files"])
+
+    def remember_findings(self, files, findings_by_file: dict, partial=frozenset()) -> None:
+        """Store full-scan results only; files checked against the skipped-file rules are rescanned."""
+        self.data["files"] = {
+            changed_file.filename: [
+                _file_digest(changed_file).hex(),
+                [[item.severity, item.message, item.line] for item in findings_by_file[changed_file.filename]],
+            ]
+            for changed_file in files
+            if changed_file.filename in findings_by_file and changed_file.filename not in partial
+        }
+
+    def commit_result(self, sha: str) -> Optional[dict]:
+        self._sync_rules()
+        return self.data["commits"].get(sha)
+
+    def remember_commits(self, results: dict) -> None:
+        """Merge ``results`` into the stored commits, keeping the ``MAX_CACHED_COMMITS`` most recently seen."""
+        self._sync_rules()
+        commits = self.data["commits"]
+        for sha, result in results.items():
+            # Re-insert so insertion order tracks when a commit was last part of a range.
+            commits.pop(sha, None)
+            commits[sha] = result
+        for sha in list(commits)[: max(0, len(commits) - MAX_CACHED_COMMITS)]:
+            del commits[sha]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+            json.dump(self.data, handle, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+def _file_digest(changed_file) -> bytes:
+    # Local ``DiffFile``s carry the digest of their patch bytes; API files are hashed here.
+    return getattr(changed_file, "digest", None) or mcp._patch_digest(changed_file.patch or "")
+
+
+def _cached_findings(files) -> dict[str, tuple]:
+    """Full-scan findings already in the in-process cache (e.g. preloaded from ``AnalysisCache``), by path."""
+    version = mcp._findings_version()
+    found = {}
+    with mcp._findings_cache_lock:
+        for changed_file in files:
+            cached = mcp._findings_cache.get((version, changed_file.filename, _file_digest(changed_file), None))
+            if cached is not None:
+                found[changed_file.filename] = cached
+    return found
+
+
+def post_quality_gate(gh_repo, commit_sha: str, counts, scope: str, is_fork: bool) -> bool:
+    if is_fork:
+        print(f"Fork PR detected. Skipping quality gate for {scope}.")
+        return True
+
+    critical_count = counts.get("critical", 0)
+    commit = gh_repo.get_commit(commit_sha)
+
+    if critical_count > 0:
+        commit.create_status(
+            state="failure",
+            description=f"MCP quality gate failed: {critical_count} critical finding(s)",
+            context="github-mcp-pro/quality-gate",
+        )
+        print(f"Quality gate failed for {scope}: {critical_count} critical finding(s).")
+        return False
+
+    commit.create_status(
+        state="success",
+        description="MCP quality gate passed",
+        context="github-mcp-pro/quality-gate",
+    )
+    print(f"Quality gate passed for {scope}.")
+    return True
+
+
+def analyze_local(repo_dir: str, base_sha: str, head_sha: str, jobs: Optional[int] = None):
+    """Scan ``merge-base(base, head)..head`` from a checkout; ``None`` when git can't (e.g. a shallow clone)."""
+    try:
+        base = local_diff.merge_base(repo_dir, base_sha, head_sha)
+        # Read from the base, like the API path, so the change under review can't exempt itself.
+        attributes = local_diff.read_blob(repo_dir, base, ".gitattributes") or ""
+        prefilter = mcp._prefilter_from_attributes(attributes)
+        with local_diff.SpooledDiff(repo_dir, base, head_sha) as diff:
+            skipped = PrefilterStats()
+            selected = []
+            partial = []
+            for changed_file in diff.files:
+                reason = prefilter.skip_reason(changed_file.filename, None, changed_file.size)
+                skipped.record(reason, changed_file.size)
+                if reason is None:
+                    selected.append(changed_file)
+                elif changed_file.size:
+                    partial.append(changed_file)
+            memo = review_rules.ScanMemo()
+            results = _cached_findings(selected)
+            misses = [changed_file for changed_file in selected if changed_file.filename not in results]
+            results.update(diff.scan(misses, mcp._scan_file, jobs, memo))
+            results.update(diff.scan(partial, mcp._scan_skipped_file, jobs, memo))
+    except local_diff.GitError as exc:
+        logger.warning("Local diff unavailable, falling back to the GitHub API: %s", exc)
+        return None
+
+    if len(misses) < len(selected):
+        logger.info("Reused cached findings for %s of %s local file(s)", len(selected) - len(misses), len(selected))
+
+    scanned = [
+        (changed_file, [mcp.Finding(*item) for item in results[changed_file.filename]])
+        for changed_file in selected + partial
+    ]
+    return mcp._build_analysis(
+        head_sha, diff.files, scanned, skipped, frozenset(changed_file.filename for changed_file in partial)
+    )
+
+
+def run_pr(
+    gh_repo,
+    repo: str,
+    pr_id: int,
+    steps,
+    cache: AnalysisCache,
+    is_fork: bool = False,
+    local_repo: Optional[str] = None,
+    jobs: Optional[int] = None,
+) -> int:
+    pr = gh_repo.get_pull(pr_id)
+    analysis = None
+    if "review" in steps or "gate" in steps:
+        reused = cache.preload_findings()
+        if local_repo:
+            analysis = analyze_local(local_repo, pr.base.sha, pr.head.sha, jobs)
+        if analysis is None:
+            analysis = mcp._analyze_pr(gh_repo, pr)
+        cache.remember_findings(analysis.files, analysis.findings_by_file, analysis.partial)
+        if reused:
+            print(f"Analysis cache: {reused} file result(s) available from earlier runs.")
+
+    comment_ids = cache.comment_ids(pr_id)
+    if "review" in steps:
+        print(mcp._publish_review(gh_repo, pr, repo, pr_id, analysis, comment_ids))
+    if "risk" in steps:
+        files = analysis.files if analysis is not None else list(pr.get_files())
+        print(mcp._publish_risk(pr, repo, pr_id, files, comment_ids))
+
+    if "gate" in steps and not post_quality_gate(gh_repo, analysis.head_sha, analysis.counts, f"PR #{pr_id}", is_fork):
+        return 1
+    return 0
+
+
+@dataclass
+class BranchScan:
+    commits: int = 0
+    from_cache: int = 0
+    files: set = field(default_factory=set)
+    findings: list = field(default_factory=list)
+    skipped: PrefilterStats = field(default_factory=PrefilterStats)
+    # Merge commits whose diff hit the compare API's file limit, so later files went unscanned.
+    truncated: list = field(default_factory=list)
+
+
+def _scan_commit(gh_repo, sha: str, prefilter, memo, first_parent: Optional[str] = None) -> dict:
+    if first_parent is None:
+        # ``Commit.files`` pages through the full file list instead of stopping at compare's 300.
+        files = list(gh_repo.get_commit(sha).files)
+    else:
+        files = list(gh_repo.compare(first_parent, sha).files)
+    truncated = first_parent is not None and len(files) >= COMPARE_FILE_LIMIT
+    if truncated:
+        logger.warning("Merge commit %s lists %d files; later files were not scanned", sha[:12], len(files))
+    stats = PrefilterStats()
+    scanned = set()
+    findings = []
+    for changed_file, reason in prefilter.classify(files, stats):
+        if reason is None:
+            scanned.add(changed_file.filename)
+            file_findings = mcp._scan_file(changed_file.filename, changed_file.patch or "", memo)
+        else:
+            file_findings = mcp._scan_skipped_file(changed_file.filename, changed_file.patch or "", memo)
+        if file_findings:
+            lines = dict(review_rules.added_lines(changed_file.patch or ""))
+            for finding in file_findings:
+                findings.append(
+                    [finding.severity, finding.path, finding.message, finding.line, lines.get(finding.line)]
+                )
+    return {
+        "files": [changed_file.filename for changed_file in files],
+        "findings": findings,
+        "skipped": [
+            [changed_file.filename, len((changed_file.patch or "").encode("utf-8", "surrogatepass"))]
+            for changed_file in files
+            if changed_file.filename not in scanned
+        ],
+        "reasons": dict(stats.reasons),
+        "truncated": truncated,
+    }
+
+
+# ``_head_line_index`` result for a file that exists at head but can't be read (e.g. too large).
+_UNREADABLE: dict = {}
+
+
+def _head_line_index(gh_repo, path: str, head_sha: str) -> Optional[dict]:
+    """Map each line of ``path`` at ``head_sha`` to its first line number; ``None`` if the file is gone."""
+    try:
+        data = getattr(gh_repo.get_contents(path, ref=head_sha), "decoded_content", None)
+    except GithubException as exc:
+        return None if exc.status == 404 else _UNREADABLE
+    if not isinstance(data, bytes):
+        return _UNREADABLE
+    index: dict[str, int] = {}
+    for number, line in enumerate(data.decode("utf-8", "replace").splitlines(), 1):
+        index.setdefault(line, number)
+    return index
+
+
+def _findings_at_head(gh_repo, head_sha: str, findings: list) -> list:
+    """Keep per-commit findings whose added line is still in the file at ``head_sha``, numbered as there.
+
+    A line added by one commit and removed by a later one of the same push is not counted. Files
+    that can't be read at head keep their findings as reported.
+    """
+    indexes: dict[str, Optional[dict]] = {}
+    kept = []
+    seen = set()
+    for severity, path, message, line, text in findings:
+        if path not in indexes:
+            indexes[path] = _head_line_index(gh_repo, path, head_sha)
+        index = indexes[path]
+        if index is None:
+            continue
+        if index is not _UNREADABLE and text is not None:
+            if text not in index:
+                continue
+            line = index[text]
+        key = (severity, path, message, line)
+        if key not in seen:
+            seen.add(key)
+            kept.append(mcp.Finding(severity, path, message, line))
+    return kept
+
+
+def scan_commit_range(gh_repo, before_sha: str, head_sha: str, prefilter, cache: AnalysisCache) -> BranchScan:
+    """Scan each commit of ``before..head`` once and report what is still present at ``head``.
+
+    Commit results are cached by SHA, so re-pushes, force-pushes and overlapping ranges only scan
+    new commits. Merge commits are diffed against their first parent, so code added while
+    resolving conflicts is scanned too. Findings are then checked against the head files, so the
+    result matches a scan of the net diff.
+    """
+    comparison = gh_repo.compare(before_sha, head_sha)
+    memo = review_rules.ScanMemo()
+    result = BranchScan()
+    results: dict[str, dict] = {}
+    findings = []
+    skipped_paths: dict[str, int] = {}
+
+    for listed in comparison.commits:
+        commit_result = cache.commit_result(listed.sha)
+        if commit_result is None:
+            first_parent = listed.parents[0].sha if len(listed.parents) > 1 else None
+            commit_result = _scan_commit(gh_repo, listed.sha, prefilter, memo, first_parent)
+        else:
+            result.from_cache += 1
+        results[listed.sha] = commit_result
+        result.commits += 1
+
+        result.files.update(commit_result["files"])
+        findings.extend(commit_result["findings"])
+        for path, size in commit_result["skipped"]:
+            skipped_paths[path] = max(size, skipped_paths.get(path, 0))
+        result.skipped.reasons.update(commit_result["reasons"])
+        if commit_result.get("truncated"):
+            result.truncated.append(listed.sha)
+
+    result.findings = _findings_at_head(gh_repo, head_sha, findings)
+    result.skipped.files_skipped = len(skipped_paths)
+    result.skipped.bytes_skipped = sum(skipped_paths.values())
+    result.skipped.files_scanned = len(result.files) - len(skipped_paths)
+    cache.remember_commits(results)
+    return result
+
+
+def scan_local_range(
+    repo_dir: str, before_sha: str, head_sha: str, cache: AnalysisCache, jobs: Optional[int] = None
+) -> Optional[BranchScan]:
+    cache.preload_findings()
+    analysis = analyze_local(repo_dir, before_sha, head_sha, jobs)
+    if analysis is None:
+        return None
+    cache.remember_findings(analysis.files, analysis.findings_by_file, analysis.partial)
+    try:
+        commits = local_diff.count_commits(repo_dir, before_sha, head_sha)
+    except local_diff.GitError:
+        commits = 0
+    return BranchScan(
+        commits=commits,
+        files={changed_file.filename for changed_file in analysis.files},
+        findings=analysis.findings,
+        skipped=analysis.skipped,
+    )
+
+
+def run_branch(
+    gh_repo,
+    ref_name: str,
+    before_sha: str,
+    head_sha: str,
+    is_fork: bool = False,
+    cache: Optional[AnalysisCache] = None,
+    local_repo: Optional[str] = None,
+    jobs: Optional[int] = None,
+) -> int:
+    commit = gh_repo.get_commit(head_sha)
+
+    if not before_sha or before_sha == NULL_SHA:
+        commit.create_status(
+            state="success",
+            description="MCP branch feedback skipped (no compare base)",
+            context="github-mcp-pro/branch-feedback",
+        )
+        print("No valid before SHA for compare. Skipping branch feedback.")
+        return 0
+
+    cache = cache or AnalysisCache(None)
+    scan = scan_local_range(local_repo, before_sha, head_sha, cache, jobs) if local_repo else None
+    if scan is None:
+        prefilter = mcp._build_prefilter(gh_repo, before_sha)
+        scan = scan_commit_range(gh_repo, before_sha, head_sha, prefilter, cache)
+    skipped = scan.skipped
+    findings = [str(finding) for finding in scan.findings]
+    counts = mcp._summarize_findings(findings)
+
+    header = "<!-- mcp-branch-feedback -->\n**🤖 Automated Branch Commit Feedback**"
+    summary = (
+        f"- Branch: `{ref_name}`\n"
+        f"- Commit: `{head_sha[:12]}`\n"
+        f"- Commits scanned: {scan.commits}" + (f" ({scan.from_cache} from cache)" if scan.from_cache else "") + "\n"
+        f"- Files changed: {len(scan.files)}\n"
+        + (f"- Skipped (critical/major rules only): {skipped.summary()}\n" if skipped.files_skipped else "")
+        + (
+            f"- ⚠️ Merge diff truncated at {COMPARE_FILE_LIMIT} files (not fully scanned): "
+            + ", ".join(f"`{sha[:12]}`" for sha in scan.truncated)
+            + "\n"
+            if scan.truncated
+            else ""
+        )
+        + f"- Findings: critical {counts['critical']}, major {counts['major']}, minor {counts['minor']}, info {counts['info']}"
+    )
+
+    if findings:
+        top = "\n".join(f"- {item}" for item in findings[:12])
+    else:
+        top = "- No common risk/lint patterns detected in this commit range."
+
+    body = f"{header}\n\n{summary}\n\n**Top findings**\n{top}"
+
+    commit.create_comment(body)
+    commit.create_status(
+        state="success",
+        description="MCP branch feedback posted",
+        context="github-mcp-pro/branch-feedback",
+    )
+
+    if not post_quality_gate(gh_repo, head_sha, counts, "branch push", is_fork):
+        return 1
+    return 0
+
+
+def _run_branch_cached(gh_repo, args) -> int:
+    cache = AnalysisCache.for_scope(args.cache_dir, args.repo, f"branch-{args.ref}")
+    try:
+        return run_branch(gh_repo, args.ref, args.before, args.head, args.fork, cache, args.local_repo, args.jobs)
+    finally:
+        cache.save()
+
+
+def run_auto(gh_repo, args) -> int:
+    if args.event == "pull_request":
+        pr_id = args.pr
+    else:
+        owner = args.repo.split("/")[0]
+        pulls = list(gh_repo.get_pulls(state="open", head=f"{owner}:{args.ref}"))
+        if not pulls:
+            print(f"No open PR found for branch '{args.ref}'. Running branch commit feedback.")
+            return _run_branch_cached(gh_repo, args)
+        pr_id = pulls[0].number
+
+    cache = AnalysisCache.for_scope(args.cache_dir, args.repo, f"pr-{pr_id}")
+    try:
+        return run_pr(gh_repo, args.repo, pr_id, STEPS, cache, args.fork, args.local_repo, args.jobs)
+    finally:
+        cache.save()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    env = os.environ
+    parser = argparse.ArgumentParser(prog="python -m mcp_cli", description="Run GitHub MCP Pro PR automation.")
+    parser.add_argument("commands", nargs="+", choices=("auto", "branch", *STEPS))
+    parser.add_argument("--repo", default=env.get("REPO", ""), help="owner/name (env REPO)")
+    parser.add_argument("--pr", type=int, default=int(env.get("PR_ID") or 0), help="PR number (env PR_ID)")
+    parser.add_argument("--event", default=env.get("EVENT_NAME", ""), help="Actions event name (env EVENT_NAME)")
+    parser.add_argument("--ref", default=env.get("REF_NAME", ""), help="branch name (env REF_NAME)")
+    parser.add_argument("--before", default=env.get("BEFORE_SHA", ""), help="push base SHA (env BEFORE_SHA)")
+    parser.add_argument("--head", default=env.get("HEAD_SHA", ""), help="push head SHA (env HEAD_SHA)")
+    parser.add_argument(
+        "--fork",
+        action="store_true",
+        default=env.get("IS_FORK", "").lower() == "true",
+        help="skip the quality-gate status for fork PRs (env IS_FORK)",
+    )
+    parser.add_argument("--cache-dir", default=env.get("MCP_CACHE_DIR") or None, help="persistent analysis cache directory")
+    parser.add_argument(
+        "--local-repo",
+        default=env.get("MCP_LOCAL_REPO") or None,
+        help="scan diffs from this git checkout instead of the GitHub API (needs full history)",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for local scans (default: CPU count)")
+    return parser
+
+
+def write_summary() -> str:
+    stats = mcp._write_stats
+    made = stats["comment_created"] + stats["comment_edited"] + stats["review_created"]
+    avoided = stats["comment_skipped"] + stats["review_skipped"]
+    return (
+        f"GitHub writes: {made} made, {avoided} avoided "
+        f"(unchanged comments {stats['comment_skipped']}, repeated reviews {stats['review_skipped']})"
+    )
+
+
+def cli(argv: Optional[list[str]] = None) -> int:
+    try:
+        return _run_cli(argv)
+    finally:
+        print(write_summary())
+
+
+def _run_cli(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    commands = set(args.commands)
+    if not args.repo:
+        raise SystemExit("--repo (or REPO) is required")
+
+    gh_repo = mcp._github_client().get_repo(args.repo)
+    if "auto" in commands:
+        return run_auto(gh_repo, args)
+    if "branch" in commands:
+        return _run_branch_cached(gh_repo, args)
+    if not args.pr:
+        raise SystemExit("--pr (or PR_ID) is required for review/risk/gate")
+
+    cache = AnalysisCache.for_scope(args.cache_dir, args.repo, f"pr-{args.pr}")
+    try:
+        return run_pr(gh_repo, args.repo, args.pr, commands, cache, args.fork, args.local_repo, args.jobs)
+    finally:
+        cache.save()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(cli())
@@ -0,0 +1,122 @@
+"""Prefilter that drops generated, vendored, excluded and oversized files before they are scanned."""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from globset import GlobSet
+
+DEFAULT_SKIP_GLOBS = (
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+    "node_modules/",
+    "vendor/",
+    "third_party/",
+    "dist/",
+)
+DEFAULT_MAX_PATCH_BYTES = 256_000
+
+
+@dataclass
+class PrefilterStats:
+    files_scanned: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    reasons: Counter = field(default_factory=Counter)
+
+    def record(self, reason: Optional[str], size: int) -> None:
+        if reason is None:
+            self.files_scanned += 1
+            return
+        self.files_skipped += 1
+        self.bytes_skipped += size
+        self.reasons[reason] += 1
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{reason} {count}" for reason, count in sorted(self.reasons.items()))
+        return f"{self.files_skipped} file(s), {self.bytes_skipped / 1024:.1f} KiB ({reasons})"
+
+
+def parse_gitattributes(text: str) -> dict[str, list[str]]:
+    """Collect patterns marked ``linguist-generated``/``linguist-vendored``, and those explicitly unset."""
+    patterns: dict[str, list[str]] = {"generated": [], "vendored": [], "keep": []}
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        pattern, *attributes = line.split()
+        for attribute in attributes:
+            name, _, value = attribute.partition("=")
+            unset = name.startswith(("-", "!")) or value.lower() == "false"
+            name = name.lstrip("-!")
+            if name not in ("linguist-generated", "linguist-vendored"):
+                continue
+            if unset:
+                patterns["keep"].append(pattern)
+            else:
+                patterns["generated" if name == "linguist-generated" else "vendored"].append(pattern)
+    return patterns
+
+
+class PathPrefilter:
+    def __init__(
+        self,
+        skip_globs: Iterable[str] = DEFAULT_SKIP_GLOBS,
+        generated: Iterable[str] = (),
+        vendored: Iterable[str] = (),
+        keep: Iterable[str] = (),
+        max_patch_bytes: int = DEFAULT_MAX_PATCH_BYTES,
+    ):
+        self.skip_globs = GlobSet(skip_globs)
+        self.generated = GlobSet(generated)
+        self.vendored = GlobSet(vendored)
+        self.keep = GlobSet(keep)
+        self.max_patch_bytes = max_patch_bytes
+
+    @classmethod
+    def from_gitattributes(cls, text: str, **kwargs) -> "PathPrefilter":
+        return cls(**parse_gitattributes(text), **kwargs)
+
+    def skip_reason(self, path: str, patch: Optional[str], size: Optional[int] = None) -> Optional[str]:
+        """Return why ``path`` should not be scanned, or ``None`` to scan it.
+
+        ``patch`` may be omitted when ``size`` (the patch length in bytes) is known.
+        """
+        if not self.keep.matches(path):
+            if self.generated.matches(path):
+                return "generated"
+            if self.vendored.matches(path):
+                return "vendored"
+            if self.skip_globs.matches(path):
+                return "excluded"
+        if not patch and not size:
+            return "no-patch"
+        if (size if size is not None else len(patch)) > self.max_patch_bytes:
+            return "oversized"
+        return None
+
+    def classify(self, files: Iterable, stats: PrefilterStats) -> Iterator[tuple[object, Optional[str]]]:
+        """Yield ``(file, skip_reason)`` for PyGithub ``File`` objects, recording each in ``stats``."""
+        for changed_file in files:
+            patch = changed_file.patch or ""
+            size = len(patch.encode("utf-8", "surrogatepass"))
+            reason = self.skip_reason(changed_file.filename, patch, size)
+            stats.record(reason, size)
+            yield changed_file, reason
+
+    def filter(self, files: Iterable, stats: PrefilterStats) -> Iterator:
+        """Yield the files worth scanning from PyGithub ``File`` objects, recording the rest in ``stats``."""
+        for changed_file, reason in self.classify(files, stats):
+            if reason is None:
+                yield changed_file
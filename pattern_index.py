@@ -0,0 +1,171 @@
+"""Aho-Corasick keyword index used to classify paths and patch lines in a single pass."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Iterable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+SENSITIVE_PATH = "sensitive_path"
+TEST_PATH = "test_path"
+PLACEHOLDER_LINE = "placeholder_line"
+PLACEHOLDER_TOKEN = "placeholder_token"
+
+DEFAULT_KEYWORDS: dict[str, tuple[str, ...]] = {
+    SENSITIVE_PATH: ("auth", "token", "secret", "crypto", "password", "login"),
+    TEST_PATH: ("test",),
+    PLACEHOLDER_LINE: ("your_token_here", "replace_with_real_token", "<real-github-token>"),
+    PLACEHOLDER_TOKEN: ("exampletoken",),
+}
+
+
+class PatternIndex:
+    """Case-insensitive multi-keyword matcher; each keyword carries one or more categories.
+
+    ``version`` hashes the keyword lists so results that depend on them can be cached per version.
+    """
+
+    def __init__(self, keywords: Mapping[str, Iterable[str]]):
+        categories_by_keyword: dict[str, set[str]] = {}
+        for category, words in keywords.items():
+            for word in words:
+                word = word.lower()
+                if word:
+                    categories_by_keyword.setdefault(word, set()).add(category)
+
+        self.keywords = tuple(sorted(categories_by_keyword))
+        self.categories = frozenset(keywords)
+        spec = {word: sorted(categories) for word, categories in categories_by_keyword.items()}
+        self.version = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+        goto: list[dict[str, int]] = [{}]
+        output: list[list[int]] = [[]]
+        for keyword_id, word in enumerate(self.keywords):
+            state = 0
+            for char in word:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    output.append([])
+                state = nxt
+            output[state].append(keyword_id)
+
+        # Resolve failure links into a full transition table so scanning never backtracks.
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state].extend(output[fail[state]])
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for char, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(char, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._lengths = tuple(len(word) for word in self.keywords)
+        self._output = [
+            tuple((keyword_id, frozenset(categories_by_keyword[self.keywords[keyword_id]])) for keyword_id in ids)
+            for ids in output
+        ]
+
+    def scan(self, text: str) -> list[tuple[int, int, frozenset[str]]]:
+        """Return ``(start, end, categories)`` for every keyword occurrence in ``text``."""
+        hits: list[tuple[int, int, frozenset[str]]] = []
+        delta = self._delta
+        output = self._output
+        state = 0
+        for index, char in enumerate(text.lower()):
+            state = delta[state].get(char, 0)
+            if output[state]:
+                end = index + 1
+                for keyword_id, categories in output[state]:
+                    hits.append((end - self._lengths[keyword_id], end, categories))
+        return hits
+
+    def classify(self, text: str) -> frozenset[str]:
+        found: set[str] = set()
+        delta = self._delta
+        output = self._output
+        state = 0
+        for char in text.lower():
+            state = delta[state].get(char, 0)
+            for _, categories in output[state]:
+                found |= categories
+        return frozenset(found)
+
+
+def load_keywords(path: str) -> dict[str, tuple[str, ...]]:
+    """Read ``{category: [keyword, ...]}`` from JSON, TOML or YAML and merge it over the defaults."""
+    with open(path, "rb") as handle:
+        raw = handle.read()
+
+    if path.endswith(".toml"):
+        import tomllib
+
+        data = tomllib.loads(raw.decode("utf-8"))
+    elif path.endswith((".yml", ".yaml")):
+        import yaml
+
+        data = yaml.safe_load(raw) or {}
+    else:
+        data = json.loads(raw or b"{}")
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Keyword config {path} must be a mapping of category to keyword list")
+
+    merged = dict(DEFAULT_KEYWORDS)
+    for category, words in data.items():
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            raise ValueError(f"Keyword category {category!r} in {path} must be a list of strings")
+        merged[category] = tuple(words)
+    return merged
+
+
+class ReloadableIndex:
+    """Holds the current ``PatternIndex`` and rebuilds it when the config file changes on disk."""
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._index = PatternIndex(DEFAULT_KEYWORDS)
+        if path:
+            self.reload()
+
+    def reload(self) -> bool:
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+            index = PatternIndex(load_keywords(self.path))
+        except Exception as exc:
+            logger.warning("Keeping previous keyword index, reload of %s failed: %s", self.path, exc)
+            return False
+
+        with self._lock:
+            self._index = index
+            self._mtime = mtime
+        return True
+
+    def get(self) -> PatternIndex:
+        if self.path:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                try:
+                    changed = os.stat(self.path).st_mtime != self._mtime
+                except OSError:
+                    changed = False
+                if changed:
+                    self.reload()
+        return self._index
@@ -0,0 +1,100 @@
+"""Rate limiter wiring: shared storage across instances, per-tenant keys and per-tool cost weights."""
+
+import hashlib
+import hmac
+import os
+from functools import lru_cache, partial
+from typing import Iterable, Mapping, Optional
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+# memory:// keeps counters per process; point this at redis://host:6379/0 (or rediss://,
+# redis+sentinel://, valkey://) so every instance and worker shares one set of counters.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "60/minute")
+# fixed-window costs one INCR+EXPIRE round trip per request on Redis.
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "fixed-window")
+
+# Only routes decorated with ``cost=tool_cost(name)`` read these.
+DEFAULT_TOOL_COSTS = {
+    "risk_analytics": 2,
+    "my_repos": 2,
+}
+
+
+def parse_tool_costs(raw: str, defaults: Mapping[str, int] = DEFAULT_TOOL_COSTS) -> dict[str, int]:
+    """Parse ``name=cost,name=cost`` overrides on top of ``defaults``."""
+    costs = dict(defaults)
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            costs[name.strip()] = max(int(value), 1)
+    return costs
+
+
+TOOL_COSTS = parse_tool_costs(os.getenv("RATE_LIMIT_TOOL_COSTS", ""))
+
+
+def tool_cost(name: str) -> int:
+    return TOOL_COSTS.get(name, 1)
+
+
+@lru_cache(maxsize=4096)
+def _token_fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:24]
+
+
+def _known_token(token: str, auth_tokens: Iterable[str]) -> bool:
+    # Compare against every configured token so the timing doesn't reveal which one matched.
+    matched = False
+    for known in auth_tokens:
+        if known and hmac.compare_digest(token.encode("utf-8"), known.encode("utf-8")):
+            matched = True
+    return matched
+
+
+def tenant_key(request: Request, auth_tokens: Optional[Iterable[str]] = None) -> str:
+    """Key requests by logged-in user, else client IP, scoped by a valid bearer token if one is sent.
+
+    A shared token (``MCP_AUTH_TOKEN`` is one value for every API client) keeps the user/IP part,
+    so one client can't use up the budget of every other client holding the same token. Unknown
+    tokens are ignored; otherwise a client could send a fresh made-up token with every request and
+    get a new bucket each time. ``auth_tokens`` defaults to ``MCP_AUTH_TOKEN``.
+    """
+    if auth_tokens is None:
+        auth_tokens = (os.getenv("MCP_AUTH_TOKEN", ""),)
+
+    identity = f"ip:{get_remote_address(request)}"
+    if "session" in request.scope:
+        user = request.session.get("user") or {}
+        if user.get("login"):
+            identity = f"user:{user['login'].lower()}"
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    token = token.strip()
+    if scheme.lower() == "bearer" and token and _known_token(token, auth_tokens):
+        return f"token:{_token_fingerprint(token)}:{identity}"
+    return identity
+
+
+def build_limiter(
+    storage_uri: str = RATE_LIMIT_STORAGE_URI,
+    default_limit: str = RATE_LIMIT_DEFAULT,
+    strategy: str = RATE_LIMIT_STRATEGY,
+    storage_options: Optional[dict] = None,
+    auth_tokens: Optional[Iterable[str]] = None,
+) -> Limiter:
+    shared = not storage_uri.startswith("memory://")
+    return Limiter(
+        key_func=tenant_key if auth_tokens is None else partial(tenant_key, auth_tokens=tuple(auth_tokens)),
+        default_limits=[default_limit],
+        storage_uri=storage_uri,
+        storage_options=storage_options or {},
+        strategy=strategy,
+        key_prefix="mcp",
+        # If the shared store is unreachable, keep limiting per process instead of failing requests.
+        in_memory_fallback_enabled=shared,
+        swallow_errors=shared,
+    )
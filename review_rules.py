@@ -0,0 +1,361 @@
+"""Declarative review rules loaded from TOML/YAML and compiled into one single-pass scanner."""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Collection, Iterator, Mapping, NamedTuple, Optional
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from globset import GlobSet
+from pattern_index import PatternIndex
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("critical", "major", "minor", "info")
+SCOPES = ("added_line", "patch")
+
+# Filters get (path, line, matched_text) and return True to keep the finding.
+RuleFilter = Callable[[str, str, str], bool]
+
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    severity: str
+    message: str
+    scope: str
+    regex: Optional[re.Pattern]
+    literals: tuple[str, ...]
+    paths: GlobSet
+    exclude_paths: GlobSet
+    suppress: tuple[re.Pattern, ...]
+    filter: Optional[RuleFilter]
+
+    def applies_to(self, path: str) -> bool:
+        if self.paths and not self.paths.matches(path):
+            return False
+        return not self.exclude_paths.matches(path)
+
+    def suppressed(self, line: str) -> bool:
+        return any(pattern.search(line) for pattern in self.suppress)
+
+
+class Hit(NamedTuple):
+    rule: Rule
+    line: Optional[int]
+
+
+def _compile_regex(rule_id: str, pattern: str, ignore_case: bool) -> re.Pattern:
+    try:
+        return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error as exc:
+        raise ValueError(f"Rule {rule_id!r} has an invalid regex: {exc}") from exc
+
+
+_GROUP_REFERENCES = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+
+
+def _has_group_reference(parsed) -> bool:
+    for op, arg in parsed:
+        if op in _GROUP_REFERENCES:
+            return True
+        pending = [arg]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, sre_parse.SubPattern):
+                if _has_group_reference(item):
+                    return True
+            elif isinstance(item, (list, tuple)):
+                pending.extend(item)
+    return False
+
+
+def _compile_rule_regex(rule_id: str, pattern: str, ignore_case: bool) -> re.Pattern:
+    """Rule regexes are joined into one prefilter alternation, where group numbers shift; refuse backreferences."""
+    compiled = _compile_regex(rule_id, pattern, ignore_case)
+    if _has_group_reference(sre_parse.parse(pattern, compiled.flags)):
+        raise ValueError(f"Rule {rule_id!r} uses a backreference, which rule regexes do not support")
+    return compiled
+
+
+def _selected(rule: Rule, path: str, severities: Optional[Collection[str]]) -> bool:
+    return rule.applies_to(path) and (severities is None or rule.severity in severities)
+
+
+class RulePack:
+    """Compiled rule set. ``version`` hashes the rule definitions so cached results can be keyed on it."""
+
+    def __init__(self, data: Mapping, filters: Optional[Mapping[str, RuleFilter]] = None):
+        filters = filters or {}
+        self.version = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        self.suppress = tuple(
+            _compile_regex("<pack>", entry["regex"], entry.get("ignore_case", False))
+            for entry in data.get("suppress", [])
+        )
+
+        rules: list[Rule] = []
+        seen: set[str] = set()
+        for raw in data.get("rules", []):
+            rule_id = raw.get("id")
+            if not rule_id or rule_id in seen:
+                raise ValueError(f"Rule ids must be present and unique, got {rule_id!r}")
+            seen.add(rule_id)
+
+            severity = str(raw.get("severity", "")).lower()
+            if severity not in SEVERITIES:
+                raise ValueError(f"Rule {rule_id!r} has unknown severity {raw.get('severity')!r}")
+            scope = raw.get("scope", "added_line")
+            if scope not in SCOPES:
+                raise ValueError(f"Rule {rule_id!r} has unknown scope {scope!r}")
+
+            literal = raw.get("literal", ())
+            literals = tuple(word.lower() for word in ([literal] if isinstance(literal, str) else literal))
+            regex = raw.get("regex")
+            if bool(literals) == bool(regex):
+                raise ValueError(f"Rule {rule_id!r} needs exactly one of 'regex' or 'literal'")
+
+            filter_name = raw.get("filter")
+            if filter_name and filter_name not in filters:
+                raise ValueError(f"Rule {rule_id!r} references unknown filter {filter_name!r}")
+
+            rules.append(
+                Rule(
+                    id=rule_id,
+                    severity=severity,
+                    message=raw.get("message", rule_id),
+                    scope=scope,
+                    regex=_compile_rule_regex(rule_id, regex, raw.get("ignore_case", False)) if regex else None,
+                    literals=literals,
+                    paths=GlobSet(raw.get("paths", ())),
+                    exclude_paths=GlobSet(raw.get("exclude_paths", ())),
+                    suppress=tuple(_compile_regex(rule_id, pattern, False) for pattern in raw.get("suppress", ())),
+                    filter=filters[filter_name] if filter_name else None,
+                )
+            )
+        self.rules = tuple(rules)
+
+        line_rules = [rule for rule in self.rules if rule.scope == "added_line"]
+        self._patch_rules = tuple(rule for rule in self.rules if rule.scope == "patch")
+        self._regex_rules = tuple(rule for rule in line_rules if rule.regex is not None)
+        self._literal_rules = {rule.id: rule for rule in line_rules if rule.literals}
+        self._literal_index = PatternIndex({rule.id: rule.literals for rule in self._literal_rules.values()})
+        self._order = {rule.id: position for position, rule in enumerate(self.rules)}
+
+        # One combined pass decides whether any regex rule can match a line at all.
+        self._regex_prefilter: Optional[re.Pattern] = None
+        if self._regex_rules:
+            try:
+                self._regex_prefilter = re.compile(
+                    "|".join(
+                        f"(?i:{rule.regex.pattern})" if rule.regex.flags & re.IGNORECASE else f"(?:{rule.regex.pattern})"
+                        for rule in self._regex_rules
+                    )
+                )
+            except re.error:
+                self._regex_prefilter = None
+
+    def _line_profile(
+        self, path: str, severities: Optional[Collection[str]] = None
+    ) -> tuple[tuple[Rule, ...], frozenset[str]]:
+        regex_rules = tuple(rule for rule in self._regex_rules if _selected(rule, path, severities))
+        literal_ids = frozenset(
+            rule_id for rule_id, rule in self._literal_rules.items() if _selected(rule, path, severities)
+        )
+        return regex_rules, literal_ids
+
+    def scan(
+        self,
+        path: str,
+        patch: str,
+        memo: Optional["ScanMemo"] = None,
+        severities: Optional[Collection[str]] = None,
+    ) -> list[Hit]:
+        """Return every rule hit in ``patch``; added-line hits carry their new-file line number.
+
+        Passing the same ``memo`` across files of one run matches each distinct added line only
+        once; path-dependent filters are still applied per location. ``severities`` limits the
+        scan to rules of those severities.
+        """
+        hits: list[Hit] = []
+        if not patch:
+            return hits
+
+        patch_rules = [rule for rule in self._patch_rules if _selected(rule, path, severities)]
+        if patch_rules:
+            lowered_patch = patch.lower()
+            for rule in patch_rules:
+                if rule.regex is not None:
+                    found = rule.regex.search(patch) is not None
+                else:
+                    found = any(literal in lowered_patch for literal in rule.literals)
+                if found:
+                    hits.append(Hit(rule, None))
+
+        profile = self._line_profile(path, severities)
+        if not profile[0] and not profile[1]:
+            return hits
+
+        table = memo.table((self.version, tuple(rule.id for rule in profile[0]), profile[1])) if memo is not None else None
+        line_no = 1
+        for raw in patch.splitlines():
+            if raw.startswith("@@"):
+                header = _HUNK_HEADER.match(raw)
+                if header:
+                    line_no = int(header.group(1))
+                continue
+            if raw.startswith("-") or raw.startswith("\\"):
+                continue
+            current = line_no
+            line_no += 1
+            if not raw.startswith("+") or raw.startswith("+++"):
+                continue
+
+            line = raw[1:]
+            if table is None:
+                matched = self._match_line(line, *profile)
+            else:
+                memo.lines_seen += 1
+                matched = table.get(line)
+                if matched is None:
+                    memo.lines_matched += 1
+                    matched = table[line] = self._match_line(line, *profile)
+            for rule, text in matched:
+                if rule.filter is None or rule.filter(path, line, text):
+                    hits.append(Hit(rule, current))
+        return hits
+
+    def _match_line(
+        self, line: str, regex_rules: tuple[Rule, ...], literal_ids: frozenset[str]
+    ) -> tuple[tuple[Rule, str], ...]:
+        if any(pattern.search(line) for pattern in self.suppress):
+            return ()
+
+        matched: list[tuple[Rule, str]] = []
+        if literal_ids:
+            seen: set[str] = set()
+            for start, end, rule_ids in self._literal_index.scan(line):
+                for rule_id in rule_ids & literal_ids:
+                    if rule_id not in seen:
+                        seen.add(rule_id)
+                        matched.append((self._literal_rules[rule_id], line[start:end]))
+
+        if regex_rules and (self._regex_prefilter is None or self._regex_prefilter.search(line)):
+            for rule in regex_rules:
+                match = rule.regex.search(line)
+                if match:
+                    matched.append((rule, match.group(0)))
+
+        matched = [(rule, text) for rule, text in matched if not rule.suppressed(line)]
+        matched.sort(key=lambda item: self._order[item[0].id])
+        return tuple(matched)
+
+
+def added_lines(patch: str) -> Iterator[tuple[int, str]]:
+    """Yield ``(new_file_line, text)`` for every added line of a unified diff ``patch``."""
+    line_no = 1
+    for raw in patch.splitlines():
+        if raw.startswith("@@"):
+            header = _HUNK_HEADER.match(raw)
+            if header:
+                line_no = int(header.group(1))
+            continue
+        if raw.startswith("-") or raw.startswith("\\"):
+            continue
+        if raw.startswith("+") and not raw.startswith("+++"):
+            yield line_no, raw[1:]
+        line_no += 1
+
+
+class ScanMemo:
+    """Per-run cache of added-line match results, one table per set of applicable rules."""
+
+    def __init__(self):
+        self._tables: dict[tuple, dict[str, tuple]] = {}
+        self.lines_seen = 0
+        self.lines_matched = 0
+
+    def table(self, profile: tuple) -> dict[str, tuple]:
+        return self._tables.setdefault(profile, {})
+
+
+def load_rule_data(path: str) -> dict:
+    with open(path, "rb") as handle:
+        raw = handle.read()
+
+    if path.endswith((".yml", ".yaml")):
+        import yaml
+
+        data = yaml.safe_load(raw) or {}
+    else:
+        import tomllib
+
+        data = tomllib.loads(raw.decode("utf-8"))
+
+    if not isinstance(data, dict) or not isinstance(data.get("rules", []), list):
+        raise ValueError(f"Rule pack {path} must define a 'rules' list")
+    return data
+
+
+class ReloadableRulePack:
+    """Serves the current ``RulePack`` and swaps in a recompiled one when the rule file changes.
+
+    Callers take one ``get()`` snapshot per scan, so in-flight scans finish on the pack they
+    started with. A rule file that fails to load keeps the previous pack in service.
+    """
+
+    def __init__(self, path: str, filters: Optional[Mapping[str, RuleFilter]] = None, check_interval: float = 2.0):
+        self.path = path
+        self.filters = dict(filters or {})
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = time.monotonic() + check_interval
+        self._mtime = os.stat(path).st_mtime
+        self._failed_mtime: Optional[float] = None
+        self._pack = RulePack(load_rule_data(path), self.filters)
+
+    def reload(self) -> bool:
+        mtime = self._stat_mtime()
+        try:
+            pack = RulePack(load_rule_data(self.path), self.filters)
+        except Exception as exc:
+            # ``_mtime`` is left alone so a broken file is retried until it parses; warn once per edit.
+            if mtime != self._failed_mtime:
+                self._failed_mtime = mtime
+                logger.warning("Keeping rule pack %s, reload of %s failed: %s", self._pack.version, self.path, exc)
+            return False
+
+        with self._lock:
+            self._mtime = mtime
+            self._failed_mtime = None
+            if pack.version != self._pack.version:
+                logger.info("Loaded rule pack %s from %s", pack.version, self.path)
+            self._pack = pack
+        return True
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def get(self) -> RulePack:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            mtime = self._stat_mtime()
+            if mtime is not None and mtime != self._mtime:
+                self.reload()
+        return self._pack
@@ -0,0 +1,276 @@
+"""SQLite-backed history of review and risk results with incrementally maintained daily rollups."""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+DIMENSIONS = ("repo", "author")
+# Query windows and row limits are clamped to these so huge inputs can't overflow date math or SQLite ints.
+MAX_DAYS = 3660
+MAX_LIMIT = 100
+
+# Public order keys mapped to SQL expressions over the aggregated rollup rows.
+ORDER_BY = {
+    "avg_risk": "avg_risk",
+    "max_risk": "max_risk",
+    "high_risk": "high_risk",
+    "critical": "critical",
+    "reviews": "reviews",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pr_results (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    pr_id INTEGER NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    head_sha TEXT NOT NULL DEFAULT '',
+    score INTEGER,
+    level TEXT,
+    factors TEXT NOT NULL DEFAULT '[]',
+    critical INTEGER NOT NULL DEFAULT 0,
+    major INTEGER NOT NULL DEFAULT 0,
+    minor INTEGER NOT NULL DEFAULT 0,
+    info INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 0,
+    additions INTEGER NOT NULL DEFAULT 0,
+    deletions INTEGER NOT NULL DEFAULT 0,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pr_results_repo_time ON pr_results(repo, created_at);
+CREATE INDEX IF NOT EXISTS idx_pr_results_author_time ON pr_results(author, created_at);
+CREATE INDEX IF NOT EXISTS idx_pr_results_time ON pr_results(created_at);
+CREATE INDEX IF NOT EXISTS idx_pr_results_run ON pr_results(repo, pr_id, kind, head_sha);
+
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    risk_runs INTEGER NOT NULL DEFAULT 0,
+    risk_score_sum INTEGER NOT NULL DEFAULT 0,
+    risk_score_max INTEGER NOT NULL DEFAULT 0,
+    high_risk INTEGER NOT NULL DEFAULT 0,
+    critical INTEGER NOT NULL DEFAULT 0,
+    major INTEGER NOT NULL DEFAULT 0,
+    minor INTEGER NOT NULL DEFAULT 0,
+    info INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 0,
+    additions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_day ON rollup_daily(dimension, day);
+"""
+
+_ROLLUP_UPSERT = """
+INSERT INTO rollup_daily (
+    dimension, key, day, reviews, risk_runs, risk_score_sum, risk_score_max, high_risk,
+    critical, major, minor, info, files, additions
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (dimension, key, day) DO UPDATE SET
+    reviews = reviews + excluded.reviews,
+    risk_runs = risk_runs + excluded.risk_runs,
+    risk_score_sum = risk_score_sum + excluded.risk_score_sum,
+    risk_score_max = MAX(risk_score_max, excluded.risk_score_max),
+    high_risk = high_risk + excluded.high_risk,
+    critical = critical + excluded.critical,
+    major = major + excluded.major,
+    minor = minor + excluded.minor,
+    info = info + excluded.info,
+    files = files + excluded.files,
+    additions = additions + excluded.additions
+"""
+
+# Backs out a replaced result; ``risk_score_max`` is recomputed from ``pr_results`` afterwards.
+_ROLLUP_SUBTRACT = """
+UPDATE rollup_daily SET
+    reviews = reviews - ?,
+    risk_runs = risk_runs - ?,
+    risk_score_sum = risk_score_sum - ?,
+    high_risk = high_risk - ?,
+    critical = critical - ?,
+    major = major - ?,
+    minor = minor - ?,
+    info = info - ?,
+    files = files - ?,
+    additions = additions - ?
+WHERE dimension = ? AND key = ? AND day = ?
+"""
+
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _day_bounds(day: str) -> tuple[int, int]:
+    start = int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    return start, start + 86400
+
+
+def clamp_days(days: int) -> int:
+    return min(max(int(days), 1), MAX_DAYS)
+
+
+def _rollup(kind: str, score: Optional[int], level: Optional[str], severity: list, files: int, additions: int) -> tuple:
+    """Rollup increments for one result, in ``_ROLLUP_UPSERT`` column order."""
+    is_risk = kind == "risk"
+    risk_score = int(score or 0) if is_risk else 0
+    return (
+        0 if is_risk else 1,
+        1 if is_risk else 0,
+        risk_score,
+        risk_score,
+        1 if is_risk and level == "high" else 0,
+        *severity,
+        files,
+        additions,
+    )
+
+
+class RiskStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(
+        self,
+        kind: str,
+        repo: str,
+        pr_id: int,
+        *,
+        author: str = "",
+        head_sha: str = "",
+        score: Optional[int] = None,
+        level: Optional[str] = None,
+        factors: Iterable[str] = (),
+        counts: Optional[dict] = None,
+        files: int = 0,
+        additions: int = 0,
+        deletions: int = 0,
+        created_at: Optional[int] = None,
+    ) -> None:
+        """Store one run's result, replacing the earlier run for the same PR head commit.
+
+        Each push and ``pull_request`` event re-runs the tools for a head; keeping one row per
+        (kind, repo, PR, head SHA) makes the rollups count PRs rather than CI runs.
+        """
+        if kind not in ("review", "risk"):
+            raise ValueError(f"Unknown result kind: {kind!r}")
+
+        counts = counts or {}
+        ts = int(created_at if created_at is not None else time.time())
+        severity = [int(counts.get(name, 0)) for name in ("critical", "major", "minor", "info")]
+        is_risk = kind == "risk"
+        rollup = _rollup(kind, score, level, severity, files, additions)
+        values = (
+            author, score if is_risk else None, level, json.dumps(list(factors)),
+            *severity, files, additions, deletions, ts,
+        )
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous = None
+                if head_sha:
+                    previous = self._conn.execute(
+                        "SELECT id, author, score, level, critical, major, minor, info, files, additions, created_at"
+                        " FROM pr_results WHERE repo = ? AND pr_id = ? AND kind = ? AND head_sha = ?"
+                        " ORDER BY id DESC LIMIT 1",
+                        (repo, pr_id, kind, head_sha),
+                    ).fetchone()
+
+                if previous is None:
+                    self._conn.execute(
+                        "INSERT INTO pr_results (kind, repo, pr_id, head_sha, author, score, level, factors,"
+                        " critical, major, minor, info, files, additions, deletions, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (kind, repo, pr_id, head_sha, *values),
+                    )
+                else:
+                    row_id, old_author, old_score, old_level, *old_counts, old_ts = previous
+                    self._conn.execute(
+                        "UPDATE pr_results SET author = ?, score = ?, level = ?, factors = ?, critical = ?,"
+                        " major = ?, minor = ?, info = ?, files = ?, additions = ?, deletions = ?, created_at = ?"
+                        " WHERE id = ?",
+                        (*values, row_id),
+                    )
+                    old_rollup = _rollup(kind, old_score, old_level, old_counts[:4], *old_counts[4:])
+                    # ``risk_score_max`` (index 3) can't be backed out by subtraction.
+                    decrement = old_rollup[:3] + old_rollup[4:]
+                    old_day = _day(old_ts)
+                    for dimension, key in (("repo", repo), ("author", old_author)):
+                        self._conn.execute(_ROLLUP_SUBTRACT, (*decrement, dimension, key, old_day))
+
+                day = _day(ts)
+                self._conn.execute(_ROLLUP_UPSERT, ("repo", repo, day, *rollup))
+                self._conn.execute(_ROLLUP_UPSERT, ("author", author, day, *rollup))
+
+                if previous is not None:
+                    for dimension, key in (("repo", repo), ("author", old_author)):
+                        self._refresh_rollup(dimension, key, old_day)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _refresh_rollup(self, dimension: str, key: str, day: str) -> None:
+        """Recompute ``risk_score_max`` for a day a result was moved out of; drop the row if it is now empty."""
+        start, end = _day_bounds(day)
+        self._conn.execute(
+            "UPDATE rollup_daily SET risk_score_max = (SELECT COALESCE(MAX(score), 0) FROM pr_results"
+            f" WHERE kind = 'risk' AND {dimension} = ? AND created_at >= ? AND created_at < ?)"
+            " WHERE dimension = ? AND key = ? AND day = ?",
+            (key, start, end, dimension, key, day),
+        )
+        self._conn.execute(
+            "DELETE FROM rollup_daily WHERE dimension = ? AND key = ? AND day = ? AND reviews <= 0 AND risk_runs <= 0",
+            (dimension, key, day),
+        )
+
+    def top(
+        self,
+        dimension: str = "repo",
+        *,
+        days: int = 30,
+        order_by: str = "avg_risk",
+        limit: int = 10,
+        now: Optional[int] = None,
+    ) -> list[dict]:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension!r}")
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unknown order: {order_by!r}")
+
+        ts = int(now if now is not None else time.time())
+        start = datetime.fromtimestamp(ts, tz=timezone.utc) - timedelta(days=clamp_days(days) - 1)
+        since = start.strftime("%Y-%m-%d")
+        query = (
+            "SELECT key, SUM(reviews) AS reviews, SUM(risk_runs) AS risk_runs,"
+            " CAST(SUM(risk_score_sum) AS REAL) / MAX(SUM(risk_runs), 1) AS avg_risk,"
+            " MAX(risk_score_max) AS max_risk, SUM(high_risk) AS high_risk,"
+            " SUM(critical) AS critical, SUM(major) AS major, SUM(minor) AS minor, SUM(info) AS info,"
+            " SUM(files) AS files, SUM(additions) AS additions"
+            " FROM rollup_daily WHERE dimension = ? AND day >= ? AND day <= ?"
+            f" GROUP BY key ORDER BY {ORDER_BY[order_by]} DESC, key ASC LIMIT ?"
+        )
+        with self._lock:
+            cursor = self._conn.execute(query, (dimension, since, _day(ts), min(max(int(limit), 1), MAX_LIMIT)))
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        results = [dict(zip(columns, row)) for row in rows]
+        for row in results:
+            row["avg_risk"] = round(row["avg_risk"], 1)
+        return results
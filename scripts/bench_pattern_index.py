@@ -0,0 +1,67 @@
+"""Microbenchmark: per-path classification cost as the keyword list grows.
+
+Compares ``PatternIndex.classify`` against the previous ``any(k in path.lower() ...)``
+loop. The Aho-Corasick cost should stay roughly flat; the naive loop grows linearly.
+
+    python scripts/bench_pattern_index.py
+"""
+
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from pattern_index import DEFAULT_KEYWORDS, SENSITIVE_PATH, PatternIndex  # noqa: E402
+
+PATHS = [
+    "src/auth/login_handler.py",
+    "frontend/components/UserProfileCard.tsx",
+    "services/payments/internal/stripe_client.go",
+    "tests/integration/test_token_refresh.py",
+    "docs/architecture/overview.md",
+    "packages/crypto-utils/src/index.ts",
+    "infra/terraform/modules/network/main.tf",
+    "app/models/very_long_module_name_for_benchmarking_purposes.rb",
+]
+
+
+def _keywords(count: int) -> list[str]:
+    rng = random.Random(count)
+    words = list(DEFAULT_KEYWORDS[SENSITIVE_PATH])
+    while len(words) < count:
+        words.append("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))))
+    return words
+
+
+def _per_path_ns(func, number: int) -> float:
+    elapsed = min(timeit.repeat(func, number=number, repeat=5))
+    return elapsed / (number * len(PATHS)) * 1e9
+
+
+def main() -> None:
+    number = 200
+    sys.stdout.write(f"{'keywords':>9} {'aho-corasick ns/path':>22} {'naive ns/path':>15}\n")
+    for count in (6, 60, 600, 6000):
+        words = _keywords(count)
+        index = PatternIndex({SENSITIVE_PATH: words})
+
+        def indexed():
+            for path in PATHS:
+                SENSITIVE_PATH in index.classify(path)
+
+        def naive():
+            for path in PATHS:
+                any(k in path.lower() for k in words)
+
+        sys.stdout.write(
+            f"{count:>9} {_per_path_ns(indexed, number):>22.0f} {_per_path_ns(naive, number):>15.0f}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
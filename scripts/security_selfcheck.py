@@ -1,103 +1,257 @@
-import asyncio
+import argparse
+import hashlib
+import json
 import os
+import re
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple, Optional
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
 
-def _run_import_with_env(env_overrides: dict[str, str | None]) -> tuple[int, str]:
-    env = os.environ.copy()
+class GuardCase(NamedTuple):
+    name: str
+    env: dict[str, str | None]
+    # Any one of these must appear in the failure message.
+    expected: tuple[str, ...]
+
+
+GUARD_CASES = (
+    GuardCase(
+        "missing-github-token",
+        # Force empty to avoid dotenv fallback values
+        {"GITHUB_TOKEN": "", "MCP_AUTH_TOKEN": None, "REQUIRE_MCP_AUTH": "false"},
+        ("Missing required GITHUB_TOKEN",),
+    ),
+    GuardCase(
+        "placeholder-github-token",
+        {"GITHUB_TOKEN": "your_token_here", "MCP_AUTH_TOKEN": None, "REQUIRE_MCP_AUTH": "false"},
+        ("placeholder value",),
+    ),
+    GuardCase(
+        "auth-required-without-mcp-token",
+        {"GITHUB_TOKEN": "ci_selfcheck_token_value_67890", "MCP_AUTH_TOKEN": None, "REQUIRE_MCP_AUTH": "true"},
+        # Accept either the default GITHUB_TOKEN guard or a custom message
+        ("Missing required GITHUB_TOKEN", "REQUIRE_MCP_AUTH is enabled", "MCP token"),
+    ),
+    GuardCase(
+        "machine-local-sessions-on-fly",
+        {
+            "GITHUB_TOKEN": "ci_selfcheck_session_case",
+            "MCP_AUTH_TOKEN": None,
+            "REQUIRE_MCP_AUTH": "false",
+            "FLY_APP_NAME": "selfcheck",
+            "SESSION_BACKEND": "memory://",
+        },
+        ("SESSION_BACKEND memory:// is not shared",),
+    ),
+    GuardCase(
+        "token-store-with-default-secret-key",
+        {
+            "GITHUB_TOKEN": "ci_selfcheck_token_store_case",
+            "MCP_AUTH_TOKEN": None,
+            "REQUIRE_MCP_AUTH": "false",
+            "SECRET_KEY": "dev-secret-key",
+            "TOKEN_ENCRYPTION_KEY": "",
+            "MCP_TOKEN_STORE": "selfcheck-tokens.sqlite3",
+        },
+        ("SECRET_KEY is the default",),
+    ),
+)
+
+_SAFE_ENV = {"REQUIRE_MCP_AUTH": "false", "MCP_AUTH_TOKEN": "dummy", "GITHUB_TOKEN": "dummy"}
+_REDACTION_SNIPPET = (
+    "import main; sample = 'leaked token ' + 'ghp_' + ('A' * 32); redacted = main._sanitize_error(sample); "
+    "assert 'ghp_' not in redacted; assert '[REDACTED_TOKEN]' in redacted"
+)
+_VERIFIER_SNIPPET = (
+    "import asyncio; import main; verifier = main.StaticTokenVerifier('expected-secret'); "
+    "valid = asyncio.run(verifier.verify_token('expected-secret')); "
+    "assert valid is not None and 'mcp:access' in valid.scopes; "
+    "invalid = asyncio.run(verifier.verify_token('wrong-secret')); assert invalid is None"
+)
+# Environment variables read by first-party code; their values are part of a cached pass's fingerprint.
+_ENV_READ = re.compile(
+    r"""(?:getenv|environ\.get|env\.get)\(\s*["']([A-Z][A-Z0-9_]*)["']"""
+    r"""|environ\[["']([A-Z][A-Z0-9_]*)["']\]"""
+)
+
+
+class CheckResult(NamedTuple):
+    name: str
+    seconds: float
+    error: Optional[str]
+    cached: bool = False
+
+
+def _case_env(env_overrides: dict[str, str | None], base: Optional[dict[str, str]] = None) -> dict[str, str]:
+    env = dict(os.environ if base is None else base)
     for key, value in env_overrides.items():
         if value is None:
             env.pop(key, None)
         else:
             env[key] = value
+    return env
+
 
+def _run_import_with_env(env_overrides: dict[str, str | None]) -> tuple[int, str]:
     result = subprocess.run(
         [sys.executable, "-c", "import main"],
         cwd=str(REPO_ROOT),
-        env=env,
+        env=_case_env(env_overrides),
         capture_output=True,
         text=True,
     )
     return result.returncode, (result.stderr or result.stdout or "").strip()
 
 
-def _assert_startup_guards() -> None:
-    code, output = _run_import_with_env(
-        {
-            "GITHUB_TOKEN": "",  # Force empty to avoid dotenv fallback values
-            "MCP_AUTH_TOKEN": None,
-            "REQUIRE_MCP_AUTH": "false",
-        }
+def _check_case_subprocess(case: GuardCase) -> None:
+    code, output = _run_import_with_env(case.env)
+    assert code != 0, f"import main should fail for {case.name}"
+    assert any(fragment in output for fragment in case.expected), output
+
+
+def _check_case_in_process(case: GuardCase) -> None:
+    """Evaluate the guards against the env ``import main`` would see, without importing the web stack."""
+    from dotenv import dotenv_values
+
+    from startup_guards import check_startup_env
+
+    # load_dotenv() in main only fills variables that are not already set.
+    dotenv = {key: value for key, value in dotenv_values(REPO_ROOT / ".env").items() if value is not None}
+    env = _case_env(case.env, {**dotenv, **os.environ})
+    for key, value in case.env.items():
+        if value is None and key in dotenv:
+            env[key] = dotenv[key]
+
+    try:
+        check_startup_env(env)
+    except RuntimeError as exc:
+        assert any(fragment in str(exc) for fragment in case.expected), str(exc)
+    else:
+        raise AssertionError(f"startup guards should fail for {case.name}")
+
+
+def _check_snippet(snippet: str, label: str) -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        env=_case_env(_SAFE_ENV),
+        cwd=str(REPO_ROOT),
+        capture_output=True,
+        text=True,
     )
-    assert code != 0, "Import should fail when GITHUB_TOKEN is missing"
-    assert "Missing required GITHUB_TOKEN" in output, output
+    assert result.returncode == 0, f"{label} test failed: {(result.stderr or result.stdout).strip()}"
 
-    code, output = _run_import_with_env(
-        {
-            "GITHUB_TOKEN": "your_token_here",
-            "MCP_AUTH_TOKEN": None,
-            "REQUIRE_MCP_AUTH": "false",
-        }
+
+def _timed(name: str, check, *args) -> CheckResult:
+    started = time.perf_counter()
+    try:
+        check(*args)
+        error = None
+    except AssertionError as exc:
+        error = str(exc) or "assertion failed"
+    return CheckResult(name, time.perf_counter() - started, error)
+
+
+def _source_state() -> tuple[bytes, tuple[str, ...]]:
+    """Digest of every first-party module ``import main`` can load plus ``.env``, and the env vars they read."""
+    digest = hashlib.sha256()
+    env_keys: set[str] = set()
+    for path in [*sorted(REPO_ROOT.glob("*.py")), REPO_ROOT / ".env"]:
+        data = path.read_bytes() if path.exists() else b"-"
+        digest.update(path.name.encode("utf-8") + b"\0" + hashlib.sha256(data).digest())
+        for match in _ENV_READ.finditer(data.decode("utf-8", "replace")):
+            env_keys.add(match.group(1) or match.group(2))
+    return digest.digest(), tuple(sorted(env_keys))
+
+
+def _case_fingerprint(case: GuardCase, mode: str, sources: tuple[bytes, tuple[str, ...]]) -> str:
+    source_digest, env_keys = sources
+    env = _case_env(case.env)
+    digest = hashlib.sha256(source_digest)
+    digest.update(
+        json.dumps(
+            [case.name, case.env, case.expected, mode, sys.executable, {key: env.get(key) for key in env_keys}]
+        ).encode("utf-8")
     )
-    assert code != 0, "Import should fail for placeholder token"
-    assert "placeholder value" in output, output
+    return digest.hexdigest()
 
-    code, output = _run_import_with_env(
-        {
-            "GITHUB_TOKEN": "ci_selfcheck_token_value_67890",
-            "MCP_AUTH_TOKEN": None,
-            "REQUIRE_MCP_AUTH": "true",
-        }
+
+def _load_cache(path: Optional[Path]) -> set[str]:
+    if path is None or not path.exists():
+        return set()
+    try:
+        return set(json.loads(path.read_text(encoding="utf-8")))
+    except ValueError:
+        return set()
+
+
+def run_checks(in_process: bool = False, jobs: Optional[int] = None, cache_path: Optional[Path] = None) -> list[CheckResult]:
+    """Run guard cases and the redaction/verifier checks concurrently.
+
+    Each subprocess check spends its time in a child interpreter, so a thread pool is enough to
+    overlap them. Passing guard cases are recorded in ``cache_path`` (when given) and skipped on
+    the next run while every first-party module, ``.env`` and the environment variables those
+    modules read are unchanged.
+    """
+    mode = "in-process" if in_process else "subprocess"
+    check_case = _check_case_in_process if in_process else _check_case_subprocess
+    passed = _load_cache(cache_path)
+    sources = _source_state() if cache_path is not None else (b"", ())
+    results: list[CheckResult] = []
+
+    with ThreadPoolExecutor(max_workers=jobs or min(8, (os.cpu_count() or 1) + 2)) as pool:
+        futures = []
+        for case in GUARD_CASES:
+            fingerprint = _case_fingerprint(case, mode, sources)
+            if fingerprint in passed:
+                results.append(CheckResult(f"guard:{case.name}", 0.0, None, cached=True))
+                continue
+            futures.append((fingerprint, pool.submit(_timed, f"guard:{case.name}", check_case, case)))
+        futures.append((None, pool.submit(_timed, "error-redaction", _check_snippet, _REDACTION_SNIPPET, "Error redaction")))
+        futures.append(
+            (None, pool.submit(_timed, "static-token-verifier", _check_snippet, _VERIFIER_SNIPPET, "StaticTokenVerifier"))
+        )
+
+        for fingerprint, future in futures:
+            result = future.result()
+            results.append(result)
+            if fingerprint is not None and result.error is None:
+                passed.add(fingerprint)
+
+    if cache_path is not None:
+        cache_path.write_text(json.dumps(sorted(passed)), encoding="utf-8")
+    return results
+
+
+def main_check(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m scripts.security_selfcheck")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="check guard logic via startup_guards instead of importing main in a subprocess per case",
     )
-    assert code != 0, "Import should fail when auth required but MCP token missing"
-    # Accept either the default GITHUB_TOKEN guard or a custom message
-    assert (
-        "Missing required GITHUB_TOKEN" in output
-        or "REQUIRE_MCP_AUTH is enabled" in output
-        or "MCP token" in output
-    ), output
-
-
-
-def _assert_error_redaction() -> None:
-    # Run in subprocess with safe env so main.py guard does not trigger
-    env = os.environ.copy()
-    env["REQUIRE_MCP_AUTH"] = "false"
-    env["MCP_AUTH_TOKEN"] = "dummy"
-    env["GITHUB_TOKEN"] = "dummy"
-    code = subprocess.run([
-        sys.executable, "-c",
-        "import main; sample = 'leaked token ' + 'ghp_' + ('A' * 32); redacted = main._sanitize_error(sample); assert 'ghp_' not in redacted; assert '[REDACTED_TOKEN]' in redacted"
-    ], env=env, cwd=str(REPO_ROOT)).returncode
-    assert code == 0, "Error redaction test failed"
-
-
-
-async def _assert_static_token_verifier() -> None:
-    # Run in subprocess with safe env so main.py guard does not trigger
-    env = os.environ.copy()
-    env["REQUIRE_MCP_AUTH"] = "false"
-    env["MCP_AUTH_TOKEN"] = "dummy"
-    env["GITHUB_TOKEN"] = "dummy"
-    code = subprocess.run([
-        sys.executable, "-c",
-        "import asyncio; import main; verifier = main.StaticTokenVerifier('expected-secret'); valid = asyncio.get_event_loop().run_until_complete(verifier.verify_token('expected-secret')); assert valid is not None and 'mcp:access' in valid.scopes; invalid = asyncio.get_event_loop().run_until_complete(verifier.verify_token('wrong-secret')); assert invalid is None"
-    ], env=env, cwd=str(REPO_ROOT)).returncode
-    assert code == 0, "StaticTokenVerifier test failed"
-
-
-def main_check() -> None:
-    _assert_startup_guards()
-    _assert_error_redaction()
-    asyncio.run(_assert_static_token_verifier())
-    sys.stdout.write("security_selfcheck_ok\n")
+    parser.add_argument("--jobs", type=int, default=None, help="concurrent checks (default: CPU count + 2, max 8)")
+    parser.add_argument("--cache", type=Path, default=None, help="file recording passed guard cases to skip next time")
+    args = parser.parse_args(argv or [])
+
+    started = time.perf_counter()
+    results = run_checks(in_process=args.in_process, jobs=args.jobs, cache_path=args.cache)
+    for result in results:
+        status = "cached" if result.cached else ("ok" if result.error is None else "FAIL")
+        sys.stdout.write(f"{status:>6} {result.seconds:6.2f}s {result.name}\n")
+
+    failures = [result for result in results if result.error is not None]
+    if failures:
+        raise AssertionError("\n".join(f"{result.name}: {result.error}" for result in failures))
+    sys.stdout.write(f"security_selfcheck_ok ({time.perf_counter() - started:.2f}s)\n")
 
 
 if __name__ == "__main__":
-    main_check()
+    main_check(sys.argv[1:])
@@ -0,0 +1,254 @@
+"""Server-side sessions: the cookie carries only an opaque id, session data lives in a backend."""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import anyio.to_thread
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_TTL = 14 * 24 * 60 * 60
+_ROTATE_KEY = "session.rotate"
+
+
+def rotate_session(request: HTTPConnection) -> None:
+    """Move the session to a fresh id on this response and delete the old record (call after login)."""
+    request.scope[_ROTATE_KEY] = True
+
+
+class MemorySessionBackend:
+    """Process-local LRU with sliding TTL; entries stay ordered by expiry, so purging stops at the first live one."""
+
+    # Calls never wait on I/O, so the middleware runs them on the event loop.
+    blocking = False
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, ttl: int) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[session_id]
+                return None
+            self._entries[session_id] = (now + ttl, entry[1])
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+    def set(self, session_id: str, data: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.time() + ttl, data)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        removed = 0
+        with self._lock:
+            while self._entries:
+                session_id, (expires_at, _) = next(iter(self._entries.items()))
+                if expires_at > now:
+                    break
+                del self._entries[session_id]
+                removed += 1
+        return removed
+
+
+class SQLiteSessionBackend:
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+
+    def get(self, session_id: str, ttl: int) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (now + ttl, session_id))
+        return row[0] if row else None
+
+    def set(self, session_id: str, data: str, ttl: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, data, time.time() + ttl),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class RedisSessionBackend:
+    """Works with any redis-py compatible client; Redis expires keys itself."""
+
+    def __init__(self, client, prefix: str = "mcp:session:"):
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, session_id: str, ttl: int) -> Optional[str]:
+        data = self._client.getex(self._prefix + session_id, ex=ttl)
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+    def set(self, session_id: str, data: str, ttl: int) -> None:
+        self._client.set(self._prefix + session_id, data, ex=ttl)
+
+    def delete(self, session_id: str) -> None:
+        self._client.delete(self._prefix + session_id)
+
+    def purge_expired(self) -> int:
+        return 0
+
+
+def session_backend_from_uri(uri: str):
+    """``memory://?max_entries=N``, ``sqlite:///path/to/sessions.db`` or ``redis://host:port/db``.
+
+    ``cookie://`` returns ``None``: the data then lives in the signed cookie (``add_session_middleware``).
+    """
+    parsed = urlparse(uri)
+    if parsed.scheme == "cookie":
+        return None
+    if parsed.scheme == "memory":
+        params = parse_qs(parsed.query)
+        return MemorySessionBackend(int(params.get("max_entries", ["10000"])[0]))
+    if parsed.scheme == "sqlite":
+        return SQLiteSessionBackend(parsed.path or ":memory:")
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        import redis
+
+        return RedisSessionBackend(redis.Redis.from_url(uri))
+    raise ValueError(f"Unsupported session backend: {uri!r}")
+
+
+def add_session_middleware(app, backend, secret_key: str, https_only: bool = False) -> None:
+    """Install server-side sessions on ``backend``, or Starlette's signed-cookie sessions if it is ``None``."""
+    if backend is None:
+        app.add_middleware(SessionMiddleware, secret_key=secret_key, https_only=https_only)
+    else:
+        app.add_middleware(ServerSessionMiddleware, backend=backend, https_only=https_only)
+
+
+class ServerSessionMiddleware:
+    """Drop-in replacement for Starlette's SessionMiddleware backed by a server-side store.
+
+    Session data is only written when it changed, the cookie is only sent when a new id is
+    issued, and expired entries are purged by a background thread. SQLite and Redis calls run
+    in a worker thread so they never block the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend,
+        session_cookie: str = "session",
+        max_age: int = DEFAULT_TTL,
+        same_site: str = "lax",
+        https_only: bool = False,
+        cleanup_interval: float = 60.0,
+    ):
+        self.app = app
+        self.backend = backend
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.security_flags = f"httponly; samesite={same_site}" + ("; secure" if https_only else "")
+        self._cleanup_interval = cleanup_interval
+        self._cleanup_started = False
+        self._cleanup_lock = threading.Lock()
+
+    def _start_cleanup(self) -> None:
+        with self._cleanup_lock:
+            if self._cleanup_started or self._cleanup_interval <= 0:
+                return
+            self._cleanup_started = True
+
+        def run() -> None:
+            while True:
+                time.sleep(self._cleanup_interval)
+                try:
+                    self.backend.purge_expired()
+                except Exception:
+                    pass
+
+        threading.Thread(target=run, name="session-cleanup", daemon=True).start()
+
+    async def _backend_call(self, method: Callable, *args):
+        if getattr(self.backend, "blocking", True):
+            return await anyio.to_thread.run_sync(method, *args)
+        return method(*args)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._cleanup_started:
+            self._start_cleanup()
+
+        connection = HTTPConnection(scope)
+        session_id = connection.cookies.get(self.session_cookie)
+        stored = await self._backend_call(self.backend.get, session_id, self.max_age) if session_id else None
+        if stored is None:
+            session_id = None
+        try:
+            scope["session"] = json.loads(stored) if stored else {}
+        except ValueError:
+            scope["session"] = {}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal session_id, stored
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                headers = MutableHeaders(scope=message)
+                if scope.pop(_ROTATE_KEY, False) and session_id is not None:
+                    await self._backend_call(self.backend.delete, session_id)
+                    session_id = stored = None
+                if session:
+                    data = json.dumps(session, separators=(",", ":"), sort_keys=True)
+                    if session_id is None:
+                        session_id = secrets.token_urlsafe(32)
+                        headers.append(
+                            "Set-Cookie",
+                            f"{self.session_cookie}={session_id}; path=/; Max-Age={self.max_age}; {self.security_flags}",
+                        )
+                    if data != stored:
+                        await self._backend_call(self.backend.set, session_id, data, self.max_age)
+                elif session_id is not None:
+                    await self._backend_call(self.backend.delete, session_id)
+                    headers.append(
+                        "Set-Cookie",
+                        f"{self.session_cookie}=null; path=/; expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,79 @@
+"""Startup configuration guards.
+
+Kept free of third-party imports so ``scripts/security_selfcheck.py`` can exercise the guard
+logic in-process without loading FastAPI, authlib or PyGithub.
+"""
+
+from typing import Mapping
+
+PLACEHOLDER_GITHUB_TOKENS = frozenset(
+    {"your_token_here", "ci_selfcheck_token_value_12345", "ci_selfcheck_token_value_67890"}
+)
+
+
+def check_mcp_auth(require_mcp_auth: bool, mcp_auth_token: str) -> None:
+    """Fail if REQUIRE_MCP_AUTH is enabled but MCP_AUTH_TOKEN is missing or only whitespace."""
+    if require_mcp_auth and not (mcp_auth_token and mcp_auth_token.strip()):
+        raise RuntimeError("REQUIRE_MCP_AUTH is enabled but MCP_AUTH_TOKEN is missing")
+
+
+def check_github_token(github_token: str) -> None:
+    """Fail if GITHUB_TOKEN is missing or a known placeholder."""
+    if github_token in PLACEHOLDER_GITHUB_TOKENS:
+        raise RuntimeError("Missing required GITHUB_TOKEN: GITHUB_TOKEN is set to a placeholder value")
+    if not github_token:
+        raise RuntimeError("Missing required GITHUB_TOKEN")
+
+
+def is_deployed(env: Mapping[str, str]) -> bool:
+    """True on Fly machines (``FLY_APP_NAME`` is set there) or when ``ENV=production``."""
+    return bool(env.get("FLY_APP_NAME")) or env.get("ENV") == "production"
+
+
+# Session backends every machine of a deployment sees; ``cookie://`` keeps the (signed) data in the cookie.
+SHARED_SESSION_SCHEMES = ("cookie", "redis", "rediss")
+
+
+def default_session_backend(env: Mapping[str, str]) -> str:
+    """Signed-cookie sessions when deployed without a shared store, an in-process store otherwise."""
+    return "cookie://" if is_deployed(env) else "memory://"
+
+
+def check_session_backend(session_backend: str, env: Mapping[str, str]) -> None:
+    """Fail if a deployed config keeps sessions where other machines can't see them.
+
+    Fly stops idle machines and runs several of them, so a ``memory://`` store or a SQLite file
+    on a machine's local disk would log users out on each auto-stop and not be shared.
+    """
+    scheme = session_backend.partition("://")[0]
+    if scheme not in SHARED_SESSION_SCHEMES and is_deployed(env):
+        raise RuntimeError(
+            f"SESSION_BACKEND {scheme}:// is not shared between machines on a deployed config; "
+            "set it to redis://... or unset it to use signed-cookie sessions"
+        )
+
+
+# ``SECRET_KEY`` when unset; it is public, so nothing derived from it is secret.
+DEFAULT_SECRET_KEY = "dev-secret-key"
+
+
+def check_token_store(token_store: str, encryption_key: str, secret_key: str) -> None:
+    """Fail if OAuth tokens would be persisted under a key derived from the default SECRET_KEY."""
+    persistent = token_store not in ("", ":memory:")
+    if persistent and not encryption_key.strip() and secret_key in ("", DEFAULT_SECRET_KEY):
+        raise RuntimeError(
+            "MCP_TOKEN_STORE is persistent but TOKEN_ENCRYPTION_KEY is unset and SECRET_KEY is the default; "
+            "set one of them before storing user tokens"
+        )
+
+
+def check_startup_env(env: Mapping[str, str]) -> None:
+    """Run every guard against ``env`` in the same order as ``import main``."""
+    check_mcp_auth(env.get("REQUIRE_MCP_AUTH", "false").lower() == "true", env.get("MCP_AUTH_TOKEN", ""))
+    check_github_token(env.get("GITHUB_TOKEN", ""))
+    check_session_backend(env.get("SESSION_BACKEND") or default_session_backend(env), env)
+    check_token_store(
+        env.get("MCP_TOKEN_STORE", ":memory:"),
+        env.get("TOKEN_ENCRYPTION_KEY", ""),
+        env.get("SECRET_KEY", DEFAULT_SECRET_KEY),
+    )
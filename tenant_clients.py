@@ -0,0 +1,121 @@
+"""Per-user GitHub tokens, encrypted at rest, and a warm LRU cache of authenticated clients."""
+
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from cachetools import LRUCache
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+
+def derive_encryption_key(secret: str) -> bytes:
+    """Derive a Fernet key from the app secret when no dedicated TOKEN_ENCRYPTION_KEY is set."""
+    raw = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"github-mcp-pro/token-store").derive(
+        secret.encode("utf-8")
+    )
+    return base64.urlsafe_b64encode(raw)
+
+
+def token_fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:24]
+
+
+class TokenStore:
+    """SQLite table of OAuth access tokens keyed by (tenant, login); only ciphertext is written."""
+
+    def __init__(self, path: str, key: bytes):
+        self._fernet = Fernet(key)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_tokens ("
+            " tenant TEXT NOT NULL, login TEXT NOT NULL, ciphertext BLOB NOT NULL, updated_at INTEGER NOT NULL,"
+            " PRIMARY KEY (tenant, login)) WITHOUT ROWID"
+        )
+
+    def put(self, tenant: str, login: str, token: str) -> None:
+        ciphertext = self._fernet.encrypt(token.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO user_tokens (tenant, login, ciphertext, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (tenant, login) DO UPDATE SET ciphertext = excluded.ciphertext,"
+                " updated_at = excluded.updated_at",
+                (tenant, login.lower(), ciphertext, int(time.time())),
+            )
+
+    def get(self, tenant: str, login: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ciphertext FROM user_tokens WHERE tenant = ? AND login = ?", (tenant, login.lower())
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return self._fernet.decrypt(row[0]).decode("utf-8")
+        except InvalidToken:
+            # Encrypted under a rotated key; the user has to log in again.
+            return None
+
+    def delete(self, tenant: str, login: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM user_tokens WHERE tenant = ? AND login = ?", (tenant, login.lower()))
+
+
+class _ClosingLRU(LRUCache):
+    def popitem(self):
+        key, entry = super().popitem()
+        _close_quietly(entry[1])
+        return key, entry
+
+
+def _close_quietly(client) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+class GithubClientCache:
+    """LRU of authenticated clients keyed by (tenant, login).
+
+    Each entry owns its own ``requests`` session, so connection pools are never shared across
+    tenants or users. A changed token for the same key replaces (and closes) the old client.
+    """
+
+    def __init__(self, factory: Callable[[str], object], maxsize: int = 256):
+        self._factory = factory
+        self._clients: LRUCache = _ClosingLRU(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tenant: str, login: str, token: str):
+        key = (tenant, login.lower())
+        fingerprint = token_fingerprint(token)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        client = self._factory(token)
+        with self._lock:
+            previous = self._clients.get(key)
+            self._clients[key] = (fingerprint, client)
+        if previous is not None and previous[1] is not client:
+            _close_quietly(previous[1])
+        return client
+
+    def evict(self, tenant: str, login: str) -> None:
+        with self._lock:
+            entry = self._clients.pop((tenant, login.lower()), None)
+        if entry is not None:
+            _close_quietly(entry[1])
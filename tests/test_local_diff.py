@@ -0,0 +1,88 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import local_diff
+
+
+def count_lines(path: str, patch_text: str, memo=None):
+    return [("info", path, str(patch_text.count("\n+")), None)]
+
+
+def run_git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+class LocalDiffTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = Path(self.tmp.name)
+        run_git(self.repo, "init", "-q")
+        run_git(self.repo, "config", "user.email", "ci@example.com")
+        run_git(self.repo, "config", "user.name", "ci")
+        (self.repo / "keep.py").write_text("a\nb\n")
+        (self.repo / "gone.txt").write_text("x\n")
+        (self.repo / "logo.png").write_bytes(b"\x00\x01")
+        run_git(self.repo, "add", ".")
+        run_git(self.repo, "commit", "-qm", "base")
+        run_git(self.repo, "checkout", "-qb", "feature")
+        (self.repo / "keep.py").write_text("a\nB\nc\n")
+        (self.repo / "gone.txt").unlink()
+        (self.repo / "with space.py").write_text("new\n")
+        (self.repo / 'quo"te.py').write_text("q\n")
+        (self.repo / "logo.png").write_bytes(b"\x00\x02")
+        run_git(self.repo, "add", "-A")
+        run_git(self.repo, "commit", "-qm", "head")
+
+    def test_spooled_diff_splits_files_into_patch_ranges(self):
+        base = local_diff.merge_base(str(self.repo), "HEAD~1", "HEAD")
+
+        with local_diff.SpooledDiff(str(self.repo), base, "HEAD") as diff:
+            files = {item.filename: item for item in diff.files}
+            patches = {name: bytes(diff.buf[item.start:item.end]).decode() for name, item in files.items()}
+            spool = Path(diff.path)
+
+        self.assertFalse(spool.exists())
+        self.assertEqual(sorted(files), ["gone.txt", "keep.py", "logo.png", 'quo"te.py', "with space.py"])
+        self.assertEqual(patches["keep.py"], "@@ -1,2 +1,3 @@\n a\n-b\n+B\n+c")
+        self.assertEqual((files["keep.py"].additions, files["keep.py"].deletions, files["keep.py"].changes), (2, 1, 3))
+        self.assertEqual(files["gone.txt"].status, "removed")
+        self.assertEqual(files["with space.py"].status, "added")
+        self.assertEqual(patches['quo"te.py'], "@@ -0,0 +1 @@\n+q")
+        self.assertEqual(files["logo.png"].size, 0)
+
+    def test_user_diff_config_does_not_change_paths_or_content(self):
+        run_git(self.repo, "config", "diff.noprefix", "true")
+        run_git(self.repo, "config", "diff.mnemonicPrefix", "true")
+        (self.repo / ".gitattributes").write_text("*.py diff=upper\n")
+        run_git(self.repo, "config", "diff.upper.textconv", "tr a-z A-Z <")
+
+        with local_diff.SpooledDiff(str(self.repo), "HEAD~1", "HEAD") as diff:
+            files = {item.filename: item for item in diff.files}
+            patch_text = bytes(diff.buf[files["keep.py"].start:files["keep.py"].end]).decode()
+
+        self.assertEqual(sorted(files), ["gone.txt", "keep.py", "logo.png", 'quo"te.py', "with space.py"])
+        self.assertEqual(patch_text, "@@ -1,2 +1,3 @@\n a\n-b\n+B\n+c")
+        self.assertEqual(files["keep.py"].changes, 3)
+
+    def test_parallel_scan_matches_serial_scan(self):
+        with local_diff.SpooledDiff(str(self.repo), "HEAD~1", "HEAD") as diff:
+            serial = diff.scan(diff.files, count_lines, jobs=1)
+            with patch.object(local_diff, "PARALLEL_MIN_BYTES", 0):
+                parallel = diff.scan(diff.files, count_lines, jobs=2)
+
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial["keep.py"], [("info", "keep.py", "2", None)])
+
+    def test_missing_revision_raises_git_error(self):
+        with self.assertRaises(local_diff.GitError):
+            local_diff.merge_base(str(self.repo), "does-not-exist", "HEAD")
+        self.assertIsNone(local_diff.read_blob(str(self.repo), "HEAD", ".gitattributes"))
+        self.assertEqual(local_diff.count_commits(str(self.repo), "HEAD~1", "HEAD"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,362 @@
+import importlib
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+from github import GithubException
+
+from pattern_index import PLACEHOLDER_TOKEN, PatternIndex
+
+from test_pr_tools import import_main_with_env
+
+
+def import_cli():
+    import_main_with_env({"GITHUB_TOKEN": "unit_test_token", "REQUIRE_MCP_AUTH": "false", "MCP_AUTH_TOKEN": None})
+    sys.modules.pop("mcp_cli", None)
+    return importlib.import_module("mcp_cli")
+
+
+def make_pr(patch_text: str, comments=()):
+    changed_file = SimpleNamespace(
+        filename="src/app.py", patch=patch_text, changes=1, additions=1, deletions=0, status="modified"
+    )
+    pr = MagicMock()
+    pr.number = 7
+    pr.head.sha = "abc123"
+    pr.user.login = "alice"
+    pr.get_files.return_value = [changed_file]
+    pr.get_issue_comments.return_value = list(comments)
+    pr.create_issue_comment.side_effect = lambda body: SimpleNamespace(id=100 + len(body) % 7, body=body)
+    gh_repo = MagicMock()
+    gh_repo.get_pull.return_value = pr
+    gh_repo.get_contents.side_effect = GithubException(404, {"message": "Not Found"})
+    return gh_repo, pr
+
+
+class RunPrTests(unittest.TestCase):
+    def setUp(self):
+        self.cli = import_cli()
+
+    def test_steps_share_one_file_listing(self):
+        gh_repo, pr = make_pr("+print('ok')")
+
+        code = self.cli.run_pr(gh_repo, "owner/repo", 7, self.cli.STEPS, self.cli.AnalysisCache(None))
+
+        self.assertEqual(code, 0)
+        pr.get_files.assert_called_once()
+        gh_repo.get_commit.return_value.create_status.assert_called_once()
+        self.assertEqual(gh_repo.get_commit.return_value.create_status.call_args.kwargs["state"], "success")
+
+    def test_gate_fails_on_critical_findings(self):
+        gh_repo, _ = make_pr("+e" + "val('x')")
+
+        code = self.cli.run_pr(gh_repo, "owner/repo", 7, {"gate"}, self.cli.AnalysisCache(None))
+
+        self.assertEqual(code, 1)
+        self.assertEqual(gh_repo.get_commit.return_value.create_status.call_args.kwargs["state"], "failure")
+
+    def test_fork_skips_gate_status(self):
+        gh_repo, _ = make_pr("+e" + "val('x')")
+
+        code = self.cli.run_pr(gh_repo, "owner/repo", 7, {"gate"}, self.cli.AnalysisCache(None), is_fork=True)
+
+        self.assertEqual(code, 0)
+        gh_repo.get_commit.return_value.create_status.assert_not_called()
+
+
+class AnalysisCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cli = import_cli()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_round_trip_reuses_findings_and_comment_ids(self):
+        patch_text = "+e" + "val('x')"
+        gh_repo, pr = make_pr(patch_text)
+        cache = self.cli.AnalysisCache.for_scope(self.tmp.name, "owner/repo", "pr-7")
+        self.cli.run_pr(gh_repo, "owner/repo", 7, {"review"}, cache)
+        cache.save()
+
+        # A fresh process: empty in-memory cache, state comes from the file only.
+        self.cli.mcp._findings_cache.clear()
+        restored = self.cli.AnalysisCache.for_scope(self.tmp.name, "owner/repo", "pr-7")
+        comment_id = restored.comment_ids(7)["<!-- mcp-review-summary -->"]
+        self.assertEqual(restored.preload_findings(), 1)
+
+        findings = self.cli.mcp._build_findings("src/app.py", patch_text)
+        self.assertTrue(findings[0].startswith("CRITICAL:"))
+
+        gh_repo, pr = make_pr(patch_text)
+        pr.get_issue_comment.return_value = SimpleNamespace(id=comment_id, body="<!-- mcp-review-summary -->", edit=MagicMock())
+        self.cli.run_pr(gh_repo, "owner/repo", 7, {"review"}, restored)
+        pr.get_issue_comment.assert_called_once_with(comment_id)
+        pr.get_issue_comments.assert_not_called()
+
+    def test_rule_pack_change_discards_findings(self):
+        cache = self.cli.AnalysisCache(None)
+        cache.data["rules"] = "stale"
+        cache.data["files"] = {"src/app.py": ["00", []]}
+
+        self.assertEqual(cache.preload_findings(), 0)
+        self.assertEqual(cache.data["files"], {})
+
+    def test_keyword_change_discards_findings(self):
+        patch_text = "+token = 'ghp_" + "exampletoken0123456789abcdefghijklmn'"
+        cache = self.cli.AnalysisCache(None)
+        self.assertEqual(self.cli.mcp._build_findings("src/app.py", patch_text), [])
+        cache.preload_findings()
+        cache.data["files"] = {"src/app.py": [self.cli.mcp._patch_digest(patch_text).hex(), []]}
+
+        edited = PatternIndex({PLACEHOLDER_TOKEN: ["sampletoken"]})
+        with patch.object(self.cli.mcp._keyword_index, "get", return_value=edited):
+            self.assertEqual(cache.preload_findings(), 0)
+            self.assertTrue(self.cli.mcp._build_findings("src/app.py", patch_text))
+
+    def test_unreadable_cache_starts_empty(self):
+        path = Path(self.tmp.name) / "broken.json.gz"
+        path.write_bytes(b"not gzip")
+
+        self.assertEqual(self.cli.AnalysisCache(path).data["files"], {})
+
+
+def make_branch(commit_patches: dict, merges=(), head_files: Optional[dict] = None):
+    listed = [
+        SimpleNamespace(
+            sha=sha,
+            parents=[SimpleNamespace(sha=f"{sha}^1"), SimpleNamespace(sha=f"{sha}^2")]
+            if sha in merges
+            else [SimpleNamespace(sha=f"{sha}^1")],
+        )
+        for sha in commit_patches
+    ]
+    commits = {
+        sha: SimpleNamespace(
+            files=[SimpleNamespace(filename=path, patch=patch_text) for path, patch_text in files.items()]
+        )
+        for sha, files in commit_patches.items()
+    }
+    head = MagicMock()
+    gh_repo = MagicMock()
+    # A merge is compared against its first parent; any other compare is the pushed range.
+    gh_repo.compare.side_effect = lambda base, sha: (
+        commits[sha] if base == f"{sha}^1" else SimpleNamespace(commits=listed)
+    )
+    gh_repo.get_commit.side_effect = lambda sha: commits[sha] if sha in commits and sha != "head" else head
+    if head_files is None:
+        # By default every added line survives to the head commit.
+        head_files = {}
+        for files in commit_patches.values():
+            for path, patch_text in files.items():
+                added = [line[1:] for line in patch_text.splitlines() if line.startswith("+")]
+                head_files[path] = head_files.get(path, "") + "".join(f"{line}\n" for line in added)
+
+    def get_contents(path, ref=None):
+        if path not in head_files:
+            raise GithubException(404, {"message": "Not Found"})
+        return SimpleNamespace(decoded_content=head_files[path].encode("utf-8"))
+
+    gh_repo.get_contents.side_effect = get_contents
+    return gh_repo, head
+
+
+class BranchScanTests(unittest.TestCase):
+    def setUp(self):
+        self.cli = import_cli()
+        self.critical = "+e" + "val('x')"
+
+    def test_merges_commits_and_scans_merge_commits_against_first_parent(self):
+        gh_repo, head = make_branch(
+            {
+                "c1": {"src/a.py": self.critical, "dist/app.min.js": "+x"},
+                "c2": {"src/a.py": self.critical, "src/b.py": "+print('ok')"},
+                "m1": {"src/c.py": self.critical},
+            },
+            merges={"m1"},
+        )
+
+        code = self.cli.run_branch(gh_repo, "feature", "base", "head")
+
+        self.assertEqual(code, 1)
+        gh_repo.compare.assert_any_call("m1^1", "m1")
+        body = head.create_comment.call_args.args[0]
+        self.assertIn("- Commits scanned: 3\n", body)
+        self.assertIn("- Files changed: 4\n", body)
+        self.assertIn("- Findings: critical 2,", body)
+        self.assertIn("Skipped (critical/major rules only): 1 file(s)", body)
+        self.assertIn("src/c.py", body)
+
+    def test_truncated_merge_diffs_are_reported(self):
+        with patch.object(self.cli, "COMPARE_FILE_LIMIT", 2):
+            gh_repo, head = make_branch(
+                {"c1": {"src/a.py": "+a = 1", "src/b.py": "+b = 1"}, "m1": {"src/c.py": "+c = 1", "src/d.py": "+d = 1"}},
+                merges={"m1"},
+            )
+            cache = self.cli.AnalysisCache(None)
+            self.cli.run_branch(gh_repo, "feature", "base", "head", cache=cache)
+
+        self.assertIn("Merge diff truncated at 2 files (not fully scanned): `m1`", head.create_comment.call_args.args[0])
+        self.assertTrue(cache.data["commits"]["m1"]["truncated"])
+        self.assertFalse(cache.data["commits"]["c1"]["truncated"])
+
+    def test_code_removed_later_in_the_push_is_not_counted(self):
+        gh_repo, head = make_branch(
+            {
+                "c1": {"src/a.py": "@@ -0,0 +1,2 @@\n+x = 1\n" + self.critical},
+                "c2": {"src/a.py": "@@ -1,2 +1,1 @@\n x = 1\n-" + self.critical[1:]},
+            },
+            head_files={"src/a.py": "x = 1\n"},
+        )
+
+        code = self.cli.run_branch(gh_repo, "feature", "base", "head")
+
+        self.assertEqual(code, 0)
+        self.assertIn("- Findings: critical 0,", head.create_comment.call_args.args[0])
+
+    def test_findings_are_renumbered_to_head_lines(self):
+        gh_repo, head = make_branch(
+            {"c1": {"src/a.py": "@@ -0,0 +1 @@\n" + self.critical}},
+            head_files={"src/a.py": "header = 1\n" + self.critical[1:] + "\n"},
+        )
+
+        prefilter = self.cli.mcp._prefilter_from_attributes("")
+        scan = self.cli.scan_commit_range(gh_repo, "base", "head", prefilter, self.cli.AnalysisCache(None))
+
+        self.assertEqual([(finding.path, finding.line) for finding in scan.findings], [("src/a.py", 2)])
+
+    def test_cached_commits_are_not_refetched(self):
+        gh_repo, _ = make_branch({"c1": {"src/a.py": self.critical}})
+        cache = self.cli.AnalysisCache(None)
+        self.cli.run_branch(gh_repo, "feature", "base", "head", cache=cache)
+
+        gh_repo, head = make_branch({"c1": {"src/a.py": self.critical}, "c2": {"src/b.py": "+print('ok')"}})
+        fetched = []
+        get_commit = gh_repo.get_commit.side_effect
+        gh_repo.get_commit.side_effect = lambda sha: fetched.append(sha) or get_commit(sha)
+        self.cli.run_branch(gh_repo, "feature", "base", "head", cache=cache)
+
+        self.assertNotIn("c1", fetched)
+        self.assertIn("c2", fetched)
+        self.assertIn("(1 from cache)", head.create_comment.call_args.args[0])
+        self.assertEqual(sorted(cache.data["commits"]), ["c1", "c2"])
+
+    def test_commit_history_is_merged_and_capped(self):
+        cache = self.cli.AnalysisCache(None)
+        cache.remember_commits({"old": {}, "c1": {}})
+        cache.remember_commits({"c1": {}, "c2": {}})
+        self.assertEqual(list(cache.data["commits"]), ["old", "c1", "c2"])
+
+        with patch.object(self.cli, "MAX_CACHED_COMMITS", 2):
+            cache.remember_commits({"c3": {}})
+        self.assertEqual(list(cache.data["commits"]), ["c2", "c3"])
+
+    def test_missing_base_skips_feedback(self):
+        gh_repo, head = make_branch({})
+
+        self.assertEqual(self.cli.run_branch(gh_repo, "feature", self.cli.NULL_SHA, "head"), 0)
+        gh_repo.compare.assert_not_called()
+        head.create_comment.assert_not_called()
+
+
+class LocalModeTests(unittest.TestCase):
+    def setUp(self):
+        self.cli = import_cli()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        repo = Path(self.tmp.name)
+
+        def git(*args):
+            subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+        git("init", "-q")
+        git("config", "user.email", "ci@example.com")
+        git("config", "user.name", "ci")
+        (repo / "src").mkdir()
+        (repo / "src" / "app.py").write_text("x = 1\n")
+        git("add", ".")
+        git("commit", "-qm", "base")
+        (repo / "src" / "app.py").write_text("x = 1\ny = e" + "val('x')\n")
+        (repo / "package-lock.json").write_text("{}\n")
+        git("add", ".")
+        git("commit", "-qm", "head")
+        self.repo = str(repo)
+
+    def test_pr_is_scanned_from_checkout(self):
+        gh_repo, pr = make_pr("+print('ok')")
+        pr.base.sha = "HEAD~1"
+        pr.head.sha = "HEAD"
+
+        cache = self.cli.AnalysisCache(None)
+        code = self.cli.run_pr(gh_repo, "owner/repo", 7, self.cli.STEPS, cache, local_repo=self.repo)
+
+        self.assertEqual(code, 1)
+        pr.get_files.assert_not_called()
+        gh_repo.get_contents.assert_not_called()
+        summary = pr.create_issue_comment.call_args_list[0].args[0]
+        self.assertIn("CRITICAL: src/app.py", summary)
+        self.assertIn("Skipped (critical/major rules only): 1 file(s)", summary)
+
+    def test_local_scan_uses_analysis_cache_and_memo(self):
+        cache_dir = Path(self.tmp.name) / "cache"
+        gh_repo, pr = make_pr("+print('ok')")
+        pr.base.sha = "HEAD~1"
+        pr.head.sha = "HEAD"
+        cache = self.cli.AnalysisCache.for_scope(str(cache_dir), "owner/repo", "pr-7")
+        scan_file = self.cli.mcp._scan_file
+        with patch.object(self.cli.mcp, "_scan_file", wraps=scan_file) as first:
+            self.cli.run_pr(gh_repo, "owner/repo", 7, {"gate"}, cache, local_repo=self.repo)
+        cache.save()
+
+        self.assertIsInstance(first.call_args_list[0].args[2], self.cli.review_rules.ScanMemo)
+        self.assertIn("src/app.py", cache.data["files"])
+
+        self.cli.mcp._findings_cache.clear()
+        restored = self.cli.AnalysisCache.for_scope(str(cache_dir), "owner/repo", "pr-7")
+        with patch.object(self.cli.mcp, "_scan_file", wraps=scan_file) as second:
+            code = self.cli.run_pr(gh_repo, "owner/repo", 7, {"gate"}, restored, local_repo=self.repo)
+
+        self.assertEqual(code, 1)
+        self.assertNotIn("src/app.py", [call.args[0] for call in second.call_args_list])
+
+    def test_attributes_added_by_the_change_do_not_hide_it(self):
+        repo = Path(self.repo)
+        (repo / ".gitattributes").write_text("gen/* linguist-generated=true\n")
+        (repo / "gen").mkdir()
+        (repo / "gen" / "client.py").write_text("run = e" + "val('y')\n")
+        subprocess.run(["git", "add", "."], cwd=repo, check=True, capture_output=True)
+        subprocess.run(["git", "commit", "-qm", "gen"], cwd=repo, check=True, capture_output=True)
+
+        analysis = self.cli.analyze_local(self.repo, "HEAD~1", "HEAD")
+
+        self.assertEqual(analysis.skipped.files_skipped, 0)
+        self.assertIn("gen/client.py", {finding.path for finding in analysis.findings})
+
+    def test_skipped_files_are_checked_for_critical_rules(self):
+        repo = Path(self.repo)
+        (repo / "package-lock.json").write_text("{}\nx = e" + "val(1)\n")
+        subprocess.run(["git", "commit", "-qam", "lock"], cwd=repo, check=True, capture_output=True)
+
+        analysis = self.cli.analyze_local(self.repo, "HEAD~1", "HEAD")
+
+        self.assertEqual(analysis.skipped.reasons["excluded"], 1)
+        self.assertEqual(analysis.counts["critical"], 1)
+        self.assertEqual(analysis.partial, frozenset({"package-lock.json"}))
+
+    def test_unknown_revision_falls_back_to_api(self):
+        gh_repo, pr = make_pr("+print('ok')")
+        pr.base.sha = "missing"
+        pr.head.sha = "HEAD"
+
+        cache = self.cli.AnalysisCache(None)
+        code = self.cli.run_pr(gh_repo, "owner/repo", 7, {"gate"}, cache, local_repo=self.repo)
+
+        self.assertEqual(code, 0)
+        pr.get_files.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
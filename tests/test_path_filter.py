@@ -0,0 +1,55 @@
+import unittest
+from types import SimpleNamespace
+
+from path_filter import PathPrefilter, PrefilterStats, parse_gitattributes
+
+GITATTRIBUTES = """
+# generated code
+api/generated/** linguist-generated=true
+third_party/** linguist-vendored
+dist/keep.js -linguist-generated
+"""
+
+
+class PathPrefilterTests(unittest.TestCase):
+    def test_parse_gitattributes(self):
+        patterns = parse_gitattributes(GITATTRIBUTES)
+
+        self.assertEqual(patterns["generated"], ["api/generated/**"])
+        self.assertEqual(patterns["vendored"], ["third_party/**"])
+        self.assertEqual(patterns["keep"], ["dist/keep.js"])
+
+    def test_skip_reasons(self):
+        prefilter = PathPrefilter.from_gitattributes(GITATTRIBUTES, max_patch_bytes=10)
+
+        self.assertEqual(prefilter.skip_reason("api/generated/client.py", "+x"), "generated")
+        self.assertEqual(prefilter.skip_reason("third_party/lib.c", "+x"), "vendored")
+        self.assertEqual(prefilter.skip_reason("web/dist/app.min.js", "+x"), "excluded")
+        self.assertEqual(prefilter.skip_reason("package-lock.json", "+x"), "excluded")
+        self.assertEqual(prefilter.skip_reason("logo.png", None), "no-patch")
+        self.assertEqual(prefilter.skip_reason("src/big.py", "+" + "x" * 20), "oversized")
+        self.assertIsNone(prefilter.skip_reason("dist/keep.js", "+x"))
+        self.assertIsNone(prefilter.skip_reason("src/app.py", "+x"))
+        self.assertIsNone(prefilter.skip_reason("src/app.py", None, size=5))
+        self.assertEqual(prefilter.skip_reason("src/big.py", None, size=20), "oversized")
+        self.assertEqual(prefilter.skip_reason("logo.png", None, size=0), "no-patch")
+
+    def test_filter_counts_skipped_files_and_bytes(self):
+        files = [
+            SimpleNamespace(filename="src/app.py", patch="+ok"),
+            SimpleNamespace(filename="yarn.lock", patch="+" + "l" * 99),
+            SimpleNamespace(filename="assets/logo.png", patch=None),
+        ]
+        stats = PrefilterStats()
+
+        kept = list(PathPrefilter().filter(files, stats))
+
+        self.assertEqual([item.filename for item in kept], ["src/app.py"])
+        self.assertEqual(stats.files_scanned, 1)
+        self.assertEqual(stats.files_skipped, 2)
+        self.assertEqual(stats.bytes_skipped, 100)
+        self.assertEqual(stats.reasons, {"excluded": 1, "no-patch": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
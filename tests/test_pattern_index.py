@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pattern_index import (
+    PLACEHOLDER_LINE,
+    SENSITIVE_PATH,
+    TEST_PATH,
+    PatternIndex,
+    ReloadableIndex,
+)
+
+
+class PatternIndexTests(unittest.TestCase):
+    def test_scan_reports_overlapping_matches(self):
+        index = PatternIndex({"a": ["he", "she", "hers"], "b": ["s"]})
+
+        hits = sorted((start, end) for start, end, _ in index.scan("ushers"))
+
+        self.assertEqual(hits, [(1, 2), (1, 4), (2, 4), (2, 6), (5, 6)])
+
+    def test_classify_is_case_insensitive_and_multi_category(self):
+        index = PatternIndex({SENSITIVE_PATH: ["auth"], TEST_PATH: ["test"]})
+
+        self.assertEqual(index.classify("Tests/AUTH_flow.py"), frozenset({SENSITIVE_PATH, TEST_PATH}))
+        self.assertEqual(index.classify("docs/readme.md"), frozenset())
+
+    def test_version_tracks_keywords(self):
+        index = PatternIndex({SENSITIVE_PATH: ["auth", "token"], TEST_PATH: ["test"]})
+
+        self.assertEqual(index.version, PatternIndex({TEST_PATH: ["TEST"], SENSITIVE_PATH: ["token", "auth"]}).version)
+        self.assertNotEqual(index.version, PatternIndex({SENSITIVE_PATH: ["auth"], TEST_PATH: ["test"]}).version)
+
+
+class ReloadableIndexTests(unittest.TestCase):
+    def test_reloads_when_config_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "keywords.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump({SENSITIVE_PATH: ["vault"]}, handle)
+
+            holder = ReloadableIndex(path, check_interval=0)
+            self.assertIn(SENSITIVE_PATH, holder.get().classify("src/vault.py"))
+            self.assertNotIn(SENSITIVE_PATH, holder.get().classify("src/auth.py"))
+            self.assertIn(PLACEHOLDER_LINE, holder.get().classify("your_token_here"))
+
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump({SENSITIVE_PATH: ["auth"]}, handle)
+            os.utime(path, (0, 12345))
+
+            self.assertIn(SENSITIVE_PATH, holder.get().classify("src/auth.py"))
+
+    def test_invalid_config_keeps_previous_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "keywords.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump({SENSITIVE_PATH: ["vault"]}, handle)
+            holder = ReloadableIndex(path, check_interval=0)
+
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write("{not json")
+            os.utime(path, (0, 12345))
+
+            self.assertIn(SENSITIVE_PATH, holder.get().classify("src/vault.py"))
+
+
+if __name__ == "__main__":
+    unittest.main()
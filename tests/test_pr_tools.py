@@ -5,6 +5,8 @@ import unittest
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+from risk_store import RiskStore
+
 
 def import_main_with_env(env_overrides: dict[str, str | None]):
     original_env = os.environ.copy()
@@ -44,6 +46,18 @@ class PRToolTests(unittest.TestCase):
         findings = self.main._build_findings("README.md", patch_text)
         self.assertEqual(findings, [])
 
+    def test_build_findings_placeholder_markers(self):
+        placeholder = "+token = '" + "gh" + "p_EXAMPLETOKENABCDEFGHIJKLMNOPQRST'"
+        real = "+token = '" + "gh" + "p_ABCDEFGHIJKLMNOPQRSTUVWXYZ123456'"
+        commented = real + "  # your_token_here"
+
+        self.assertEqual(self.main._build_findings("src/config.py", placeholder), [])
+        self.assertEqual(self.main._build_findings("src/config.py", commented), [])
+        self.assertEqual(
+            self.main._build_findings("src/config.py", real),
+            ["CRITICAL: src/config.py potential hardcoded GitHub token"],
+        )
+
     def test_summarize_findings_counts(self):
         counts = self.main._summarize_findings(
             [
@@ -135,6 +149,87 @@ class PRToolTests(unittest.TestCase):
         pr.create_review.assert_called_once()
         self.assertEqual(pr.create_review.call_args.kwargs["event"], "APPROVE")
 
+    def test_review_pr_skips_repeated_approval_and_unchanged_summary(self):
+        pr = MagicMock()
+        pr.get_files.return_value = [SimpleNamespace(filename="src/app.py", patch="+print('ok')", changes=1)]
+        pr.get_issue_comments.return_value = []
+        pr.head = SimpleNamespace(sha="abc123")
+        gh_repo = MagicMock()
+        gh_repo.get_pull.return_value = pr
+        gh = MagicMock()
+        gh.get_repo.return_value = gh_repo
+
+        with patch.object(self.main, "Github", return_value=gh):
+            self.main.review_pr("owner/repo", 16)
+        summary = MagicMock(body=pr.create_issue_comment.call_args.args[0])
+        pr.get_issue_comments.return_value = [summary]
+        self.assertIn("<!-- mcp-review-state: APPROVE@abc123 -->", summary.body)
+        self.assertIn("<!-- mcp-hash:", summary.body)
+
+        with patch.object(self.main, "Github", return_value=gh):
+            self.main.review_pr("owner/repo", 16)
+
+        pr.create_review.assert_called_once()
+        summary.edit.assert_not_called()
+        self.assertEqual(self.main._write_stats["review_skipped"], 1)
+        self.assertEqual(self.main._write_stats["comment_skipped"], 1)
+
+        pr.head = SimpleNamespace(sha="def456")
+        with patch.object(self.main, "Github", return_value=gh):
+            self.main.review_pr("owner/repo", 16)
+
+        self.assertEqual(pr.create_review.call_count, 2)
+        self.assertIn("APPROVE@def456", summary.edit.call_args.args[0])
+
+    def test_review_pr_skipped_files_still_face_critical_rules(self):
+        files = [
+            SimpleNamespace(filename="dist/app.min.js", patch="+console.log(1)", changes=1),
+            SimpleNamespace(filename="api/client_gen.py", patch="+e" + "val('x')", changes=1),
+            SimpleNamespace(filename="src/app.py", patch="+print('ok')", changes=1),
+        ]
+        pr = MagicMock()
+        pr.get_files.return_value = files
+        pr.get_issue_comments.return_value = []
+        pr.head = SimpleNamespace(sha="abc123")
+        pr.base = SimpleNamespace(sha="base999")
+
+        gh_repo = MagicMock()
+        gh_repo.get_pull.return_value = pr
+        gh_repo.get_contents.return_value = SimpleNamespace(
+            decoded_content=b"api/*_gen.py linguist-generated=true\n"
+        )
+
+        gh = MagicMock()
+        gh.get_repo.return_value = gh_repo
+
+        with patch.object(self.main, "Github", return_value=gh):
+            result = self.main.review_pr("owner/repo", 15)
+
+        self.assertEqual(gh_repo.get_contents.call_args.kwargs["ref"], "base999")
+        self.assertIn("critical:1", result)
+        self.assertIn("Skipped 2 file(s)", result)
+        summary_body = pr.create_issue_comment.call_args.args[0]
+        self.assertIn("excluded 1, generated 1", summary_body)
+        self.assertIn("api/client_gen.py", summary_body)
+        self.assertNotIn("console.log", summary_body)
+        self.assertEqual(pr.create_review.call_args.kwargs["event"], "COMMENT")
+
+    def test_github_client_prefers_cached_user_token(self):
+        self.main._token_store.put(self.main.MCP_TENANT_ID, "alice", "user-oauth-token")
+        clients = {}
+
+        def fake_github(auth=None, **kwargs):
+            return clients.setdefault(auth.token, MagicMock())
+
+        with patch.object(self.main, "Github", side_effect=fake_github):
+            user_client = self.main._github_client("alice")
+            self.assertIs(self.main._github_client("alice"), user_client)
+            service_client = self.main._github_client()
+            self.assertIsNone(self.main._github_client("bob", fallback=False))
+
+        self.assertIs(user_client, clients["user-oauth-token"])
+        self.assertIs(service_client, clients["unit_test_token"])
+
     def test_assess_pr_risk_posts_own_comment(self):
         files = [
             SimpleNamespace(filename="auth/login.py", additions=350),
@@ -159,6 +254,38 @@ class PRToolTests(unittest.TestCase):
         self.assertIn("Risk score:", result)
         existing_comment.edit.assert_called_once()
 
+        existing_comment.body = existing_comment.edit.call_args.args[0]
+        with patch.object(self.main, "Github", return_value=gh):
+            self.main.assess_pr_risk("owner/repo", 42)
+
+        existing_comment.edit.assert_called_once()
+
+    def test_assess_pr_risk_records_history_when_store_enabled(self):
+        files = [SimpleNamespace(filename="auth/login.py", additions=350, deletions=5)]
+        pr = MagicMock()
+        pr.get_files.return_value = files
+        pr.get_issue_comments.return_value = []
+        pr.user = SimpleNamespace(login="alice")
+        pr.head = SimpleNamespace(sha="abc123")
+
+        gh_repo = MagicMock()
+        gh_repo.get_pull.return_value = pr
+
+        gh = MagicMock()
+        gh.get_repo.return_value = gh_repo
+
+        store = RiskStore(":memory:")
+        with patch.object(self.main, "_risk_store", store), patch.object(self.main, "Github", return_value=gh):
+            self.main.assess_pr_risk("owner/repo", 42)
+            self.main.assess_pr_risk("owner/repo", 42)
+            summary = self.main.risk_analytics(dimension="author", days=10**9)
+            unsupported = self.main.risk_analytics(dimension="team")
+
+        self.assertIn("alice: avg risk 30.0", summary)
+        self.assertIn("risk runs 1,", summary)
+        self.assertIn("over the last 3660 day(s)", summary)
+        self.assertTrue(unsupported.startswith("Unsupported dimension"))
+
 
 if __name__ == "__main__":
     unittest.main()
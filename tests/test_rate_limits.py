@@ -0,0 +1,97 @@
+import unittest
+
+import fakeredis
+import redis
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from starlette.middleware.sessions import SessionMiddleware
+
+from rate_limits import build_limiter, parse_tool_costs, tenant_key
+
+
+def make_app(limiter, limit: str = "2/minute", cost: int = 1, auth_tokens=("secret-token",)) -> FastAPI:
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.add_middleware(SessionMiddleware, secret_key="test-secret")
+
+    @app.get("/ping")
+    @limiter.limit(limit, cost=cost)
+    async def ping(request: Request):
+        return {"key": tenant_key(request, auth_tokens)}
+
+    return app
+
+
+class TenantKeyTests(unittest.TestCase):
+    def test_bearer_token_is_hashed_into_key(self):
+        client = TestClient(make_app(build_limiter(auth_tokens=["secret-token"]), limit="100/minute"))
+
+        response = client.get("/ping", headers={"Authorization": "Bearer secret-token"})
+
+        key = response.json()["key"]
+        self.assertTrue(key.startswith("token:"))
+        self.assertTrue(key.endswith(":ip:testclient"))
+        self.assertNotIn("secret-token", key)
+
+    def test_clients_sharing_a_token_keep_separate_buckets(self):
+        app = make_app(build_limiter(auth_tokens=["secret-token"]))
+        headers = {"Authorization": "Bearer secret-token"}
+        first = TestClient(app, client=("203.0.113.1", 50000))
+        second = TestClient(app, client=("203.0.113.2", 50000))
+
+        self.assertEqual([first.get("/ping", headers=headers).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(second.get("/ping", headers=headers).status_code, 200)
+
+    def test_unknown_bearer_tokens_share_the_address_bucket(self):
+        client = TestClient(make_app(build_limiter(auth_tokens=["secret-token"])))
+
+        responses = [
+            client.get("/ping", headers={"Authorization": f"Bearer made-up-{attempt}"}) for attempt in range(3)
+        ]
+
+        self.assertEqual(responses[0].json()["key"], "ip:testclient")
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+
+    def test_falls_back_to_client_address(self):
+        client = TestClient(make_app(build_limiter(), limit="100/minute"))
+
+        self.assertEqual(client.get("/ping").json()["key"], "ip:testclient")
+
+    def test_parse_tool_costs_overrides_defaults(self):
+        costs = parse_tool_costs("risk_analytics=10, new_tool=4,bad", {"risk_analytics": 2, "my_repos": 2})
+
+        self.assertEqual(costs, {"risk_analytics": 10, "my_repos": 2, "new_tool": 4})
+
+
+class SharedStorageTests(unittest.TestCase):
+    def _redis_limiter(self, server):
+        pool = redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=server)
+        return build_limiter(
+            storage_uri="redis://localhost:6379/0",
+            storage_options={"connection_pool": pool},
+            auth_tokens=["tenant-a", "tenant-b"],
+        )
+
+    def test_instances_share_one_budget(self):
+        server = fakeredis.FakeServer()
+        first = TestClient(make_app(self._redis_limiter(server)))
+        second = TestClient(make_app(self._redis_limiter(server)))
+        headers = {"Authorization": "Bearer tenant-a"}
+
+        self.assertEqual(first.get("/ping", headers=headers).status_code, 200)
+        self.assertEqual(second.get("/ping", headers=headers).status_code, 200)
+        self.assertEqual(first.get("/ping", headers=headers).status_code, 429)
+        self.assertEqual(second.get("/ping", headers={"Authorization": "Bearer tenant-b"}).status_code, 200)
+
+    def test_cost_weight_consumes_budget(self):
+        client = TestClient(make_app(build_limiter(), limit="5/minute", cost=3))
+
+        self.assertEqual(client.get("/ping").status_code, 200)
+        self.assertEqual(client.get("/ping").status_code, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+from globset import GlobSet
+from review_rules import ReloadableRulePack, RulePack, ScanMemo
+
+PACK = {
+    "suppress": [{"regex": r"nolint"}],
+    "rules": [
+        {"id": "no-print", "severity": "minor", "message": "print added", "regex": r"\bprint\(", "paths": ["*.py"]},
+        {"id": "todo", "severity": "info", "message": "TODO added", "literal": ["todo", "fixme"]},
+        {
+            "id": "secret",
+            "severity": "critical",
+            "message": "secret added",
+            "literal": "secret",
+            "exclude_paths": ["docs/"],
+            "suppress": [r"example"],
+        },
+        {"id": "bundle", "severity": "major", "message": "touches bundle", "scope": "patch", "literal": "webpack"},
+    ],
+}
+
+
+class GlobSetTests(unittest.TestCase):
+    def test_gitignore_style_matching(self):
+        globs = GlobSet(["*.min.js", "/build/", "vendor/**", "docs/*.md"])
+
+        self.assertTrue(globs.matches("static/app.min.js"))
+        self.assertTrue(globs.matches("build/out/index.html"))
+        self.assertFalse(globs.matches("src/build/readme.txt"))
+        self.assertTrue(globs.matches("vendor/lib/a.go"))
+        self.assertTrue(globs.matches("docs/intro.md"))
+        self.assertFalse(globs.matches("docs/api/intro.md"))
+        self.assertFalse(GlobSet().matches("anything"))
+
+
+class RulePackTests(unittest.TestCase):
+    def test_scan_applies_paths_scopes_and_suppressions(self):
+        pack = RulePack(PACK)
+        patch = "\n".join(
+            [
+                " webpack config",
+                "+print('todo')",
+                "+secret = 1",
+                "+secret example = 1",
+                "+print('x')  # nolint",
+                "-print('removed')",
+            ]
+        )
+
+        self.assertEqual([hit.rule.id for hit in pack.scan("app.py", patch)], ["bundle", "no-print", "todo", "secret"])
+        self.assertEqual([hit.rule.id for hit in pack.scan("docs/app.js", patch)], ["bundle", "todo"])
+
+    def test_filter_can_drop_matches(self):
+        data = {"rules": [{"id": "key", "severity": "critical", "message": "key", "regex": r"key-\w+", "filter": "f"}]}
+        pack = RulePack(data, filters={"f": lambda path, line, text: text != "key-demo"})
+
+        self.assertEqual(len(pack.scan("a.py", "+key-demo\n+key-real")), 1)
+
+    def test_hits_carry_new_file_line_numbers(self):
+        patch = "@@ -10,3 +20,4 @@\n context\n-todo old\n+todo new\n+ok\n@@ -40 +51,1 @@\n+fixme"
+
+        hits = RulePack(PACK).scan("a.txt", patch)
+
+        self.assertEqual([(hit.rule.id, hit.line) for hit in hits], [("todo", 21), ("todo", 51)])
+
+    def test_memo_matches_repeated_lines_once_and_keeps_path_filters(self):
+        data = {"rules": [{"id": "key", "severity": "critical", "message": "key", "regex": r"key-\w+", "filter": "f"}]}
+        pack = RulePack(data, filters={"f": lambda path, line, text: not path.startswith("docs/")})
+        memo = ScanMemo()
+        patch = "+key-one\n+key-one\n+plain"
+
+        src_hits = pack.scan("src/a.py", patch, memo)
+        doc_hits = pack.scan("docs/a.md", patch, memo)
+
+        self.assertEqual([hit.line for hit in src_hits], [1, 2])
+        self.assertEqual(doc_hits, [])
+        self.assertEqual(memo.lines_seen, 6)
+        self.assertEqual(memo.lines_matched, 2)
+
+    def test_version_tracks_rule_content(self):
+        changed = {**PACK, "rules": PACK["rules"][:1]}
+
+        self.assertEqual(RulePack(PACK).version, RulePack(dict(PACK)).version)
+        self.assertNotEqual(RulePack(PACK).version, RulePack(changed).version)
+
+    def test_invalid_rules_are_rejected(self):
+        bad_rules = [
+            {"id": "a", "severity": "fatal", "message": "m", "literal": "x"},
+            {"id": "a", "severity": "info", "message": "m"},
+            {"id": "a", "severity": "info", "message": "m", "regex": "("},
+            {"id": "a", "severity": "info", "message": "m", "literal": "x", "filter": "missing"},
+            {"id": "a", "severity": "info", "message": "m", "regex": r"(['\"])secret\1"},
+            {"id": "a", "severity": "info", "message": "m", "regex": r"(?P<q>['\"])x(?P=q)"},
+            {"id": "a", "severity": "info", "message": "m", "regex": r"(a)?(?(1)b|c)"},
+        ]
+        for rule in bad_rules:
+            with self.assertRaises(ValueError):
+                RulePack({"rules": [rule]})
+
+    def test_combined_prefilter_keeps_every_rule_reachable(self):
+        pack = RulePack(
+            {
+                "rules": [
+                    {"id": "grouped", "severity": "info", "message": "g", "regex": r"(foo|bar)baz"},
+                    {"id": "named", "severity": "info", "message": "n", "regex": r"(?P<word>qux)\d"},
+                ]
+            }
+        )
+
+        self.assertEqual([hit.rule.id for hit in pack.scan("x.py", "+barbaz")], ["grouped"])
+        self.assertEqual([hit.rule.id for hit in pack.scan("x.py", "+qux1")], ["named"])
+
+
+class ReloadableRulePackTests(unittest.TestCase):
+    def _write(self, path: str, body: str, mtime: int) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(body)
+        os.utime(path, (mtime, mtime))
+
+    def test_reloads_on_change_and_keeps_pack_on_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.yaml")
+            self._write(path, "rules:\n- {id: a, severity: info, message: a, literal: alpha}\n", 1000)
+            holder = ReloadableRulePack(path, check_interval=0)
+            first = holder.get()
+
+            self._write(path, "rules:\n- {id: b, severity: info, message: b, literal: beta}\n", 2000)
+            second = holder.get()
+            self.assertNotEqual(first.version, second.version)
+            self.assertEqual([hit.rule.id for hit in second.scan("x", "+beta")], ["b"])
+
+            self._write(path, "rules: [", 3000)
+            self.assertIs(holder.get(), second)
+
+            # Fixed without the mtime moving on (e.g. within the filesystem's timestamp resolution).
+            self._write(path, "rules:\n- {id: c, severity: info, message: c, literal: gamma}\n", 3000)
+            self.assertEqual([rule.id for rule in holder.get().rules], ["c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
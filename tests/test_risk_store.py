@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime, timezone
+
+from risk_store import RiskStore
+
+NOW = int(datetime(2026, 10, 15, 12, tzinfo=timezone.utc).timestamp())
+DAY = 86400
+
+
+class RiskStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.store = RiskStore(":memory:")
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_rollup_ranks_repos_by_average_risk(self):
+        self.store.record("risk", "org/a", 1, author="alice", score=80, level="high", created_at=NOW)
+        self.store.record("risk", "org/a", 2, author="bob", score=40, level="medium", created_at=NOW - DAY)
+        self.store.record("risk", "org/b", 3, author="alice", score=20, level="low", created_at=NOW)
+
+        rows = self.store.top("repo", days=30, now=NOW)
+
+        self.assertEqual([row["key"] for row in rows], ["org/a", "org/b"])
+        self.assertEqual(rows[0]["avg_risk"], 60.0)
+        self.assertEqual(rows[0]["max_risk"], 80)
+        self.assertEqual(rows[0]["high_risk"], 1)
+        self.assertEqual(rows[0]["risk_runs"], 2)
+
+    def test_reviews_roll_up_severity_counts_by_author(self):
+        counts = {"critical": 2, "major": 1, "minor": 0, "info": 3}
+        self.store.record("review", "org/a", 1, author="alice", counts=counts, files=4, created_at=NOW)
+        self.store.record("review", "org/b", 2, author="alice", counts=counts, files=1, created_at=NOW)
+
+        rows = self.store.top("author", order_by="critical", now=NOW)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["key"], "alice")
+        self.assertEqual(rows[0]["reviews"], 2)
+        self.assertEqual(rows[0]["critical"], 4)
+        self.assertEqual(rows[0]["files"], 5)
+        self.assertEqual(rows[0]["risk_runs"], 0)
+
+    def test_window_excludes_older_days(self):
+        self.store.record("risk", "org/old", 1, score=90, level="high", created_at=NOW - 40 * DAY)
+        self.store.record("risk", "org/new", 2, score=10, level="low", created_at=NOW)
+
+        rows = self.store.top("repo", days=30, now=NOW)
+
+        self.assertEqual([row["key"] for row in rows], ["org/new"])
+
+    def test_rerun_for_the_same_head_replaces_the_result(self):
+        self.store.record("risk", "org/a", 1, author="alice", head_sha="h1", score=90, level="high", created_at=NOW)
+        self.store.record("risk", "org/a", 1, author="alice", head_sha="h1", score=30, level="low", created_at=NOW)
+        self.store.record("risk", "org/a", 2, author="bob", head_sha="h2", score=50, level="medium", created_at=NOW)
+
+        row = self.store.top("repo", now=NOW)[0]
+
+        self.assertEqual((row["risk_runs"], row["avg_risk"], row["max_risk"], row["high_risk"]), (2, 40.0, 50, 0))
+        self.assertEqual(self.store._conn.execute("SELECT COUNT(*) FROM pr_results").fetchone()[0], 2)
+
+    def test_rerun_on_a_later_day_moves_the_result(self):
+        counts = {"critical": 1}
+        self.store.record("review", "org/a", 1, head_sha="h1", counts=counts, created_at=NOW - DAY)
+        self.store.record("review", "org/a", 1, head_sha="h1", counts=counts, created_at=NOW)
+
+        self.assertEqual([row["reviews"] for row in self.store.top("repo", now=NOW)], [1])
+        self.assertEqual(self.store.top("repo", days=1, now=NOW - DAY), [])
+
+    def test_window_and_limit_are_clamped(self):
+        self.store.record("risk", "org/a", 1, score=10, level="low", created_at=NOW)
+
+        rows = self.store.top("repo", days=10**9, limit=10**30, now=NOW)
+
+        self.assertEqual([row["key"] for row in rows], ["org/a"])
+        self.assertEqual(self.store.top("repo", days=-5, now=NOW)[0]["key"], "org/a")
+
+    def test_rejects_unknown_dimension_and_kind(self):
+        with self.assertRaises(ValueError):
+            self.store.top("team")
+        with self.assertRaises(ValueError):
+            self.store.record("lint", "org/a", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import importlib
 import io
 import os
+import tempfile
 import unittest
 from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from startup_guards import check_startup_env
 
 
 class SecuritySelfcheckTests(unittest.TestCase):
@@ -25,6 +30,76 @@ class SecuritySelfcheckTests(unittest.TestCase):
 
         self.assertIn("security_selfcheck_ok", out.getvalue())
 
+    def test_in_process_mode_reports_timing_and_caches_passes(self):
+        module = importlib.import_module("scripts.security_selfcheck")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = Path(tmp) / "selfcheck.json"
+            first = module.run_checks(in_process=True, cache_path=cache_path)
+            with patch.object(module, "_check_case_in_process") as check_case:
+                second = module.run_checks(in_process=True, cache_path=cache_path)
+
+        self.assertTrue(all(result.error is None for result in first))
+        self.assertEqual({result.name for result in first}, {result.name for result in second})
+        self.assertTrue(all(result.cached for result in second if result.name.startswith("guard:")))
+        check_case.assert_not_called()
+
+    def test_cached_passes_depend_on_every_module_and_the_environment(self):
+        module = importlib.import_module("scripts.security_selfcheck")
+        case = module.GUARD_CASES[0]
+        sources = module._source_state()
+        fingerprint = module._case_fingerprint(case, "subprocess", sources)
+
+        self.assertIn("SESSION_BACKEND", sources[1])
+        self.assertIn("MCP_TOKEN_STORE", sources[1])
+        os.environ["SESSION_BACKEND"] = "sqlite:///selfcheck.db"
+        self.assertNotEqual(module._case_fingerprint(case, "subprocess", sources), fingerprint)
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(module, "REPO_ROOT", Path(tmp)):
+            (Path(tmp) / "main.py").write_text("import rate_limits\n")
+            (Path(tmp) / "rate_limits.py").write_text("LIMIT = os.getenv('RATE_LIMIT_DEFAULT')\n")
+            before = module._source_state()
+            (Path(tmp) / "rate_limits.py").write_text("LIMIT = '1/minute'\n")
+            after = module._source_state()
+
+        self.assertEqual(before[1], ("RATE_LIMIT_DEFAULT",))
+        self.assertNotEqual(before[0], after[0])
+
+
+class StartupGuardTests(unittest.TestCase):
+    def test_guards_match_main_import_order(self):
+        with self.assertRaisesRegex(RuntimeError, "REQUIRE_MCP_AUTH is enabled"):
+            check_startup_env({"REQUIRE_MCP_AUTH": "true", "MCP_AUTH_TOKEN": "  ", "GITHUB_TOKEN": ""})
+        with self.assertRaisesRegex(RuntimeError, "placeholder value"):
+            check_startup_env({"GITHUB_TOKEN": "your_token_here"})
+        with self.assertRaisesRegex(RuntimeError, "Missing required GITHUB_TOKEN"):
+            check_startup_env({})
+
+        check_startup_env({"REQUIRE_MCP_AUTH": "true", "MCP_AUTH_TOKEN": "secret", "GITHUB_TOKEN": "real"})
+
+    def test_deployed_config_needs_a_shared_session_backend(self):
+        with self.assertRaisesRegex(RuntimeError, "SESSION_BACKEND memory:// is not shared"):
+            check_startup_env({"GITHUB_TOKEN": "real", "FLY_APP_NAME": "mcp", "SESSION_BACKEND": "memory://"})
+        with self.assertRaisesRegex(RuntimeError, "SESSION_BACKEND sqlite:// is not shared"):
+            check_startup_env({"GITHUB_TOKEN": "real", "ENV": "production", "SESSION_BACKEND": "sqlite:///data/s.db"})
+
+        # Unset on a deployed config falls back to signed-cookie sessions.
+        check_startup_env({"GITHUB_TOKEN": "real", "FLY_APP_NAME": "mcp"})
+        check_startup_env({"GITHUB_TOKEN": "real", "FLY_APP_NAME": "mcp", "SESSION_BACKEND": "redis://cache:6379/0"})
+        check_startup_env({"GITHUB_TOKEN": "real", "SESSION_BACKEND": "sqlite:///tmp/s.db"})
+
+    def test_persistent_token_store_needs_a_private_key(self):
+        with self.assertRaisesRegex(RuntimeError, "TOKEN_ENCRYPTION_KEY is unset and SECRET_KEY is the default"):
+            check_startup_env({"GITHUB_TOKEN": "real", "MCP_TOKEN_STORE": "/data/tokens.sqlite3"})
+        with self.assertRaisesRegex(RuntimeError, "SECRET_KEY is the default"):
+            check_startup_env(
+                {"GITHUB_TOKEN": "real", "MCP_TOKEN_STORE": "/data/t.db", "SECRET_KEY": "dev-secret-key"}
+            )
+
+        check_startup_env({"GITHUB_TOKEN": "real"})
+        check_startup_env({"GITHUB_TOKEN": "real", "MCP_TOKEN_STORE": "/data/t.db", "SECRET_KEY": "s3cr3t"})
+        check_startup_env({"GITHUB_TOKEN": "real", "MCP_TOKEN_STORE": "/data/t.db", "TOKEN_ENCRYPTION_KEY": "k"})
+
 
 if __name__ == "__main__":
     unittest.main()
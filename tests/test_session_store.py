@@ -0,0 +1,169 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from session_store import (
+    MemorySessionBackend,
+    RedisSessionBackend,
+    ServerSessionMiddleware,
+    SQLiteSessionBackend,
+    add_session_middleware,
+    rotate_session,
+    session_backend_from_uri,
+)
+
+
+def make_app(backend) -> FastAPI:
+    app = FastAPI()
+    if backend is None:
+        add_session_middleware(app, None, "test-secret")
+    else:
+        app.add_middleware(ServerSessionMiddleware, backend=backend, cleanup_interval=0)
+
+    @app.get("/login")
+    async def login(request: Request):
+        request.session["user"] = {"login": "alice"}
+        return {}
+
+    @app.get("/auth")
+    async def auth(request: Request):
+        request.session["user"] = {"login": "alice"}
+        rotate_session(request)
+        return {}
+
+    @app.get("/whoami")
+    async def whoami(request: Request):
+        return {"user": request.session.get("user")}
+
+    @app.get("/logout")
+    async def logout(request: Request):
+        request.session.clear()
+        return {}
+
+    return app
+
+
+class ServerSessionMiddlewareTests(unittest.TestCase):
+    def test_cookie_holds_only_an_opaque_id(self):
+        backend = MemorySessionBackend()
+        client = TestClient(make_app(backend))
+
+        response = client.get("/login")
+        session_id = client.cookies.get("session")
+
+        self.assertNotIn("alice", response.headers["set-cookie"])
+        self.assertIn("httponly", response.headers["set-cookie"])
+        self.assertIn("alice", backend.get(session_id, 60))
+        self.assertEqual(client.get("/whoami").json(), {"user": {"login": "alice"}})
+
+    def test_unchanged_session_is_not_rewritten(self):
+        backend = MemorySessionBackend()
+        client = TestClient(make_app(backend))
+        client.get("/login")
+
+        with patch.object(backend, "set", wraps=backend.set) as spy:
+            response = client.get("/whoami")
+
+        spy.assert_not_called()
+        self.assertNotIn("set-cookie", response.headers)
+
+    def test_clearing_session_deletes_it(self):
+        backend = MemorySessionBackend()
+        client = TestClient(make_app(backend))
+        client.get("/login")
+        session_id = client.cookies.get("session")
+
+        client.get("/logout")
+
+        self.assertIsNone(backend.get(session_id, 60))
+        self.assertEqual(client.get("/whoami").json(), {"user": None})
+
+    def test_login_rotates_session_id(self):
+        backend = MemorySessionBackend()
+        client = TestClient(make_app(backend))
+        client.get("/login")
+        planted = client.cookies.get("session")
+
+        client.get("/auth")
+
+        self.assertNotEqual(client.cookies.get("session"), planted)
+        self.assertIsNone(backend.get(planted, 60))
+        self.assertEqual(client.get("/whoami").json(), {"user": {"login": "alice"}})
+
+    def test_blocking_backend_runs_off_the_event_loop(self):
+        threads = []
+
+        class RecordingBackend(SQLiteSessionBackend):
+            def get(self, session_id, ttl):
+                threads.append(threading.get_ident())
+                return super().get(session_id, ttl)
+
+        app = make_app(RecordingBackend(":memory:"))
+
+        @app.get("/loop-thread")
+        async def loop_thread(request: Request):
+            return {"thread": threading.get_ident()}
+
+        client = TestClient(app)
+        client.get("/login")
+        loop_ident = client.get("/loop-thread").json()["thread"]
+
+        self.assertTrue(threads)
+        self.assertNotIn(loop_ident, threads)
+
+    def test_cookie_uri_falls_back_to_signed_cookie_sessions(self):
+        self.assertIsNone(session_backend_from_uri("cookie://"))
+        client = TestClient(make_app(session_backend_from_uri("cookie://")))
+
+        client.get("/auth")
+
+        self.assertEqual(client.get("/whoami").json(), {"user": {"login": "alice"}})
+
+    def test_unknown_session_id_starts_empty(self):
+        client = TestClient(make_app(MemorySessionBackend()))
+        client.cookies.set("session", "forged-id")
+
+        self.assertEqual(client.get("/whoami").json(), {"user": None})
+
+
+class BackendTests(unittest.TestCase):
+    def _exercise(self, backend):
+        backend.set("a", '{"x":1}', 60)
+        self.assertEqual(backend.get("a", 60), '{"x":1}')
+        backend.delete("a")
+        self.assertIsNone(backend.get("a", 60))
+
+    def test_memory_backend_lru_and_expiry(self):
+        backend = MemorySessionBackend(max_entries=2)
+        self._exercise(backend)
+
+        backend.set("old", "1", 60)
+        backend.set("mid", "2", 60)
+        backend.set("new", "3", 60)
+        self.assertIsNone(backend.get("old", 60))
+
+        self.assertEqual(backend.purge_expired(), 0)
+        with patch("session_store.time.time", return_value=time.time() + 120):
+            self.assertEqual(backend.purge_expired(), 2)
+
+    def test_sqlite_backend_purges_expired(self):
+        backend = SQLiteSessionBackend(":memory:")
+        self._exercise(backend)
+
+        backend.set("gone", "1", -1)
+        backend.set("live", "2", 60)
+        self.assertIsNone(backend.get("gone", 60))
+        self.assertEqual(backend.purge_expired(), 1)
+        self.assertEqual(backend.get("live", 60), "2")
+
+    def test_redis_backend(self):
+        self._exercise(RedisSessionBackend(fakeredis.FakeRedis()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import MagicMock
+
+from cryptography.fernet import Fernet
+
+from tenant_clients import GithubClientCache, TokenStore, derive_encryption_key
+
+
+class TokenStoreTests(unittest.TestCase):
+    def test_tokens_are_encrypted_at_rest(self):
+        store = TokenStore(":memory:", derive_encryption_key("app-secret"))
+        store.put("acme", "Alice", "gho_user_token_value")
+
+        ciphertext = store._conn.execute("SELECT ciphertext FROM user_tokens").fetchone()[0]
+
+        self.assertNotIn(b"gho_user_token_value", ciphertext)
+        self.assertEqual(store.get("acme", "alice"), "gho_user_token_value")
+        self.assertIsNone(store.get("other-tenant", "alice"))
+
+    def test_rotated_key_and_delete(self):
+        store = TokenStore(":memory:", Fernet.generate_key())
+        store.put("acme", "alice", "token-1")
+        store._fernet = Fernet(Fernet.generate_key())
+        self.assertIsNone(store.get("acme", "alice"))
+
+        store.delete("acme", "alice")
+        self.assertIsNone(store._conn.execute("SELECT 1 FROM user_tokens").fetchone())
+
+
+class GithubClientCacheTests(unittest.TestCase):
+    def test_reuses_client_until_token_changes(self):
+        factory = MagicMock(side_effect=lambda token: MagicMock(name=token))
+        cache = GithubClientCache(factory)
+
+        first = cache.get("acme", "alice", "token-1")
+        self.assertIs(cache.get("acme", "Alice", "token-1"), first)
+        self.assertIsNot(cache.get("beta", "alice", "token-1"), first)
+
+        rotated = cache.get("acme", "alice", "token-2")
+        self.assertIsNot(rotated, first)
+        first.close.assert_called_once()
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_lru_eviction_and_explicit_evict_close_clients(self):
+        cache = GithubClientCache(lambda token: MagicMock(), maxsize=1)
+
+        first = cache.get("acme", "alice", "token-a")
+        second = cache.get("acme", "bob", "token-b")
+        first.close.assert_called_once()
+
+        cache.evict("acme", "bob")
+        second.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()